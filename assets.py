@@ -0,0 +1,136 @@
+# assets.py
+import logging
+import struct
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+BIRD_IMAGES = ['imgs/bird1.png', 'imgs/bird2.png', 'imgs/bird3.png']
+PIPE_IMAGE = 'imgs/pipe.png'
+BG_IMAGE = 'imgs/bg.png'
+BASE_IMAGE = 'imgs/base.png'
+PIPE_SCALE = 1.7  # Pipes are drawn 70% bigger than the source image
+
+# Sizes used when an image can't be read (same as the drawn placeholders)
+FALLBACK_BIRD_SIZE = (34, 24)
+FALLBACK_PIPE_SIZE = (52, 320)
+FALLBACK_BASE_HEIGHT = 100
+
+Dimensions = namedtuple('Dimensions', [
+    'bird_width', 'bird_height', 'bird_frames',
+    'pipe_width', 'pipe_height',
+    'base_height',
+])
+
+Sprites = namedtuple('Sprites', ['bird_frames', 'pipe_top', 'pipe_bottom', 'bg', 'base'])
+
+_dimensions = None
+_sprites = {}
+
+def png_size(path):
+    """Read (width, height) from a PNG header without decoding the image."""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    if header[:8] != b'\x89PNG\r\n\x1a\n' or header[12:16] != b'IHDR':
+        raise ValueError(f"Not a PNG file: {path}")
+    return struct.unpack('>II', header[16:24])
+
+def _size_or(path, fallback):
+    try:
+        return png_size(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Unable to read image size %s: %s", path, e)
+        return fallback
+
+def get_dimensions():
+    """
+    Sprite sizes that drive collision geometry, read once from the PNG
+    headers. Needs neither a display nor decoded surfaces.
+    """
+    global _dimensions
+    if _dimensions is None:
+        bird_width, bird_height = _size_or(BIRD_IMAGES[0], FALLBACK_BIRD_SIZE)
+        try:
+            pipe_width, pipe_height = png_size(PIPE_IMAGE)
+            pipe_width = int(pipe_width * PIPE_SCALE)
+            pipe_height = int(pipe_height * PIPE_SCALE)
+        except (OSError, ValueError) as e:
+            logger.warning("Unable to read image size %s: %s", PIPE_IMAGE, e)
+            pipe_width, pipe_height = FALLBACK_PIPE_SIZE
+        base_height = _size_or(BASE_IMAGE, (0, FALLBACK_BASE_HEIGHT))[1]
+        _dimensions = Dimensions(bird_width, bird_height, len(BIRD_IMAGES),
+                                 pipe_width, pipe_height, base_height)
+        logger.debug("Asset dimensions: %s", _dimensions)
+    return _dimensions
+
+def simulator_options(screen_width=500, screen_height=700):
+    """PopulationSimulator keyword arguments matching the sprites' geometry."""
+    dims = get_dimensions()
+    return dict(screen_width=screen_width, screen_height=screen_height, base_height=dims.base_height,
+                bird_width=dims.bird_width, bird_height=dims.bird_height,
+                pipe_width=dims.pipe_width, pipe_height=dims.pipe_height)
+
+def _load(path, alpha=True):
+    """Decode an image, converting it for fast blits if a display is set."""
+    import pygame
+    image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha() if alpha else image.convert()
+    return image
+
+def _load_sprites(screen_width, screen_height):
+    import pygame
+
+    bird_frames = []
+    for path in BIRD_IMAGES:
+        try:
+            bird_frames.append(_load(path))
+            logger.debug("Loaded bird image: %s", path)
+        except pygame.error as e:
+            logger.warning("Unable to load bird image %s: %s", path, e)
+            # Create a placeholder if image fails to load
+            placeholder = pygame.Surface(FALLBACK_BIRD_SIZE, pygame.SRCALPHA)
+            pygame.draw.circle(placeholder, (255, 255, 0), (17, 12), 12)  # Yellow circle
+            bird_frames.append(placeholder)
+
+    dims = get_dimensions()
+    try:
+        scaled = pygame.transform.scale(_load(PIPE_IMAGE), (dims.pipe_width, dims.pipe_height))
+        pipe_top = pygame.transform.flip(scaled, False, True)
+        pipe_bottom = scaled
+        logger.debug("Loaded and scaled pipe image.")
+    except pygame.error as e:
+        logger.warning("Unable to load pipe image %s: %s", PIPE_IMAGE, e)
+        logger.warning("Using colored rectangles as placeholders.")
+        pipe_top = pipe_bottom = None
+
+    try:
+        # Ensure the background fits the screen
+        bg = pygame.transform.scale(_load(BG_IMAGE, alpha=False), (screen_width, screen_height))
+        logger.debug("Loaded background image.")
+    except pygame.error as e:
+        logger.warning("Unable to load background image: %s", e)
+        bg = pygame.Surface((screen_width, screen_height))
+        bg.fill((135, 206, 235))  # Sky blue fallback
+
+    try:
+        # Scale base to match screen width
+        base = pygame.transform.scale(_load(BASE_IMAGE), (screen_width, dims.base_height))
+        logger.debug("Loaded base image.")
+    except pygame.error as e:
+        logger.warning("Unable to load base image: %s", e)
+        base = pygame.Surface((screen_width, dims.base_height), pygame.SRCALPHA)
+        pygame.draw.rect(base, (222, 184, 135), base.get_rect())  # Sandy brown fallback
+
+    return Sprites(bird_frames, pipe_top, pipe_bottom, bg, base)
+
+def get_sprites(screen_width=500, screen_height=700):
+    """
+    Decoded, scaled and flipped surfaces, loaded once per process and shared
+    by every Bird, Pipe and Game. Only needed for drawing.
+    """
+    import pygame
+    key = (screen_width, screen_height, pygame.display.get_surface() is not None)
+    if key not in _sprites:
+        _sprites[key] = _load_sprites(screen_width, screen_height)
+    return _sprites[key]
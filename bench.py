@@ -0,0 +1,326 @@
+# bench.py
+"""
+Reproducible performance benchmarks.
+
+    python -m bench --sizes 50 500 5000 --frames 2000 --seed 0
+
+For every population size it reports frames/sec and bird-steps/sec of each
+engine, generations/sec with the time spent in each GA phase, and a
+fixed-seed fitness checksum. Engines that play the same seeded course must
+print the same checksum; "match" says whether they do.
+
+    python -m bench --policies 1 8 64 5000
+
+times one decision of each network evaluator (NeuralNetwork.forward per
+bird, PopulationBrain and the compiled policies) at those batch sizes.
+
+    python -m bench --startup 5
+
+starts fresh interpreters and reports, for each entry point, the time to
+import it, the time to its first simulated (or drawn) frame, the process
+wall time and whether pygame got loaded. Headless paths must say "no".
+
+    python -m bench --optimizers 50 --runs 5 --max-generations 200
+
+trains with each optimizer (the GA, ES and ES with an adaptive step size)
+on seeds seed..seed+runs-1 until the best bird passes 50 pipes, and reports
+the generations and total bird-steps each needed to get there.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+from game import Game, simulator_options
+from genetic_algorithm import birds_from_genomes, select_parent_indices, crossover_rows, mutate_rows
+from neural_network import GenomeMatrix, NeuralNetwork, PopulationBrain
+from optimizers import EvolutionStrategy, GeneticOptimizer
+from policy import BufferedPolicy, ScalarPolicy
+from profiling import Profiler
+from simulation import PopulationSimulator
+from utils import configure_logging
+
+def fitness_checksum(scores):
+    """Short, order-sensitive digest of a fitness array."""
+    return hashlib.sha256(np.asarray(scores, dtype=np.int64).tobytes()).hexdigest()[:16]
+
+def make_population(size, seed):
+    return GenomeMatrix.random(size, np.random.default_rng(seed))
+
+def run_objects(genomes, course_seed, max_frames):
+    """Object engine: one Bird per genome, stepped through Game.step()."""
+    birds = birds_from_genomes(genomes)
+    game = Game(birds, None)
+    game.reset(birds, seed=course_seed)
+    frames = bird_steps = 0
+    start = time.perf_counter()
+    while frames < max_frames:
+        alive = sum(bird.is_alive for bird in birds)
+        if not alive:
+            break
+        bird_steps += alive
+        game.step()
+        frames += 1
+    seconds = time.perf_counter() - start
+    return frames, bird_steps, seconds, [bird.score for bird in birds]
+
+def run_vectorized(genomes, course_seed, max_frames):
+    """Vectorized engine: PopulationSimulator driven by a PopulationBrain, one step() per frame."""
+    sim = PopulationSimulator(len(genomes), rng=np.random.default_rng(course_seed), event_driven=False,
+                              **simulator_options())
+    brain = PopulationBrain.from_flat(genomes.data)
+    frames = bird_steps = 0
+    start = time.perf_counter()
+    while frames < max_frames:
+        alive = int(sim.alive.sum())
+        if not alive:
+            break
+        bird_steps += alive
+        sim.step(brain)
+        frames += 1
+    seconds = time.perf_counter() - start
+    return frames, bird_steps, seconds, sim.get_fitness_scores()
+
+def run_event(genomes, course_seed, max_frames):
+    """Vectorized engine stepped by advance(), fast-forwarding whenever no bird can flap."""
+    profiler = Profiler()
+    profiler.begin_generation(0)
+    sim = PopulationSimulator(len(genomes), rng=np.random.default_rng(course_seed), profiler=profiler,
+                              **simulator_options())
+    brain = PopulationBrain.from_flat(genomes.data)
+    start = time.perf_counter()
+    frames = sim.run(brain, max_frames)
+    seconds = time.perf_counter() - start
+    return frames, profiler.counters['bird_steps'], seconds, sim.get_fitness_scores()
+
+ENGINES = {'objects': run_objects, 'vectorized': run_vectorized, 'event': run_event}
+
+def bench_engines(size, seed, max_frames, engines):
+    """Time each engine on the same genomes and course."""
+    genomes = make_population(size, seed)
+    results = {}
+    for name in engines:
+        frames, bird_steps, seconds, scores = ENGINES[name](genomes, seed, max_frames)
+        results[name] = dict(frames=frames, bird_steps=bird_steps, seconds=seconds,
+                             fps=frames / seconds if seconds else float('inf'),
+                             bird_steps_per_sec=bird_steps / seconds if seconds else float('inf'),
+                             checksum=fitness_checksum(scores))
+    return results
+
+def bench_generations(size, seed, max_frames, generations, num_parents=20):
+    """Full training loop on the vectorized engine, timed per GA phase."""
+    rng = np.random.default_rng(seed)
+    genomes = GenomeMatrix.random(size, rng)
+    phases = dict(evaluate=0.0, select=0.0, crossover=0.0, mutate=0.0)
+    num_parents = min(num_parents, size)
+    start = time.perf_counter()
+    for _ in range(generations):
+        t0 = time.perf_counter()
+        _, _, _, fitness = run_vectorized(genomes, int(rng.integers(0, 2**63 - 1)), max_frames)
+        t1 = time.perf_counter()
+        parents = genomes.data[select_parent_indices(fitness, num_parents)]
+        best = genomes.data[int(np.argmax(fitness))]
+        t2 = time.perf_counter()
+        children = crossover_rows(parents, size - 1, rng)
+        t3 = time.perf_counter()
+        mutate_rows(children, 0.1, rng)
+        genomes = GenomeMatrix(np.concatenate([best[None, :], children]))
+        t4 = time.perf_counter()
+        phases['evaluate'] += t1 - t0
+        phases['select'] += t2 - t1
+        phases['crossover'] += t3 - t2
+        phases['mutate'] += t4 - t3
+    total = time.perf_counter() - start
+    return dict(generations_per_sec=generations / total,
+                phases_ms={name: seconds / generations * 1000 for name, seconds in phases.items()})
+
+# Optimizers compared by bench_optimizer, built for a population size
+OPTIMIZER_SETUPS = {
+    'ga': lambda size: GeneticOptimizer(size, num_parents=min(20, size)),
+    'es': lambda size: EvolutionStrategy(size),
+    'es-adaptive': lambda size: EvolutionStrategy(size, adaptive=True),
+}
+
+def bench_optimizer(name, size, seed, max_frames, target, max_generations):
+    """
+    Train on the vectorized engine, one new seeded course per generation,
+    until the best genome passes `target` pipes. Returns the generations and
+    bird-steps that took, or None for both if max_generations ran out.
+    """
+    rng = np.random.default_rng(seed)
+    optimizer = OPTIMIZER_SETUPS[name](size)
+    genomes = optimizer.initial_population(rng)
+    total_steps = 0
+    for generation in range(1, max_generations + 1):
+        _, bird_steps, _, fitness = run_vectorized(genomes, int(rng.integers(0, 2**63 - 1)), max_frames)
+        total_steps += bird_steps
+        if max(fitness) >= target:
+            return dict(generations=generation, bird_steps=total_steps)
+        genomes = optimizer.next_population(genomes, fitness, rng)
+    return dict(generations=None, bird_steps=None)
+
+def bench_policies(batch, seed=0, min_seconds=0.2):
+    """Seconds per decision of each network evaluator on `batch` birds."""
+    genomes = make_population(batch, seed)
+    inputs = np.random.default_rng(seed).random((batch, 4))
+    networks = [NeuralNetwork(**genomes.genome(i)) for i in range(batch)]
+    brain = PopulationBrain.from_flat(genomes.data)
+    buffered = BufferedPolicy.from_flat(genomes.data)
+    scalar = ScalarPolicy(genomes)
+    evaluators = {
+        'forward': lambda: [network.forward(row) for network, row in zip(networks, inputs)],
+        'brain': lambda: brain.forward(inputs),
+        'buffered': lambda: buffered.forward(inputs),
+        # A single bird is asked for one output, not an array of them
+        'scalar': (lambda: scalar.forward_one(inputs[0])) if batch == 1 else (lambda: scalar.forward(inputs)),
+    }
+    results = {}
+    for name, call in evaluators.items():
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            call()
+            calls += 1
+            seconds = time.perf_counter() - start
+            if seconds >= min_seconds:
+                break
+        results[name] = seconds / calls / batch
+    return results
+
+# Entry points timed by bench_startup: (imports, code that produces the first frame)
+STARTUP_SCENARIOS = {
+    'simulation': ("import numpy as np\n"
+                   "from assets import simulator_options\n"
+                   "from neural_network import GenomeMatrix, PopulationBrain\n"
+                   "from simulation import PopulationSimulator\n",
+                   "genomes = GenomeMatrix.random(50, np.random.default_rng(0))\n"
+                   "sim = PopulationSimulator(50, rng=np.random.default_rng(0), **simulator_options())\n"
+                   "sim.step(PopulationBrain.from_flat(genomes.data))\n"),
+    'objects': ("import numpy as np\n"
+                "from game import Game\n"
+                "from genetic_algorithm import birds_from_genomes\n"
+                "from neural_network import GenomeMatrix\n",
+                "genomes = GenomeMatrix.random(50, np.random.default_rng(0))\n"
+                "Game(birds_from_genomes(genomes), rng=np.random.default_rng(0)).step()\n"),
+    # What every spawned evaluation worker pays before its first task
+    'main': ("import main\n", ""),
+    'worker': ("import numpy as np\n"
+               "from assets import simulator_options\n"
+               "from neural_network import GenomeMatrix\n"
+               "from parallel import ParallelEvaluator\n",
+               "with ParallelEvaluator(1, seed=0, sim_options=simulator_options(), max_frames=1) as evaluator:\n"
+               "    evaluator.evaluate(GenomeMatrix.random(1, np.random.default_rng(0)).data)\n"),
+    'rendered': ("import os\n"
+                 "os.environ['SDL_VIDEODRIVER'] = 'dummy'\n"
+                 "import numpy as np\n"
+                 "import pygame\n"
+                 "from game import Game\n"
+                 "from genetic_algorithm import birds_from_genomes\n"
+                 "from neural_network import GenomeMatrix\n",
+                 "pygame.init()\n"
+                 "screen = pygame.display.set_mode((500, 700))\n"
+                 "genomes = GenomeMatrix.random(50, np.random.default_rng(0))\n"
+                 "Game(birds_from_genomes(genomes), screen, rng=np.random.default_rng(0)).step(render=True)\n"
+                 "pygame.display.flip()\n"),
+}
+
+STARTUP_TEMPLATE = """import time
+start = time.perf_counter()
+{imports}imported = time.perf_counter()
+{first_frame}done = time.perf_counter()
+import json, sys
+print(json.dumps(dict(import_seconds=imported - start, first_frame_seconds=done - start,
+                      pygame='pygame' in sys.modules)))
+"""
+
+def bench_startup(name, repeats=5):
+    """
+    Median startup times of one STARTUP_SCENARIOS entry, each run in a fresh
+    interpreter: import, first frame (import included) and process wall time.
+    """
+    imports, first_frame = STARTUP_SCENARIOS[name]
+    code = STARTUP_TEMPLATE.format(imports=imports, first_frame=first_frame)
+    root = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                                capture_output=True, text=True).stdout
+        wall = time.perf_counter() - start
+        runs.append(dict(json.loads(output.splitlines()[-1]), wall_seconds=wall))
+    return dict(import_seconds=statistics.median(r['import_seconds'] for r in runs),
+                first_frame_seconds=statistics.median(r['first_frame_seconds'] for r in runs),
+                wall_seconds=statistics.median(r['wall_seconds'] for r in runs),
+                pygame=any(r['pygame'] for r in runs))
+
+def main(sizes=(50, 500, 5000), frames=2000, seed=0, generations=5, max_object_size=500, policies=None,
+         startup=None, optimizers=None, runs=5, max_generations=200):
+    if optimizers is not None:
+        for size in sizes:
+            print(f"population {size}, target {optimizers} pipes")
+            for name in OPTIMIZER_SETUPS:
+                results = [bench_optimizer(name, size, run_seed, frames, optimizers, max_generations)
+                           for run_seed in range(seed, seed + runs)]
+                reached = [r for r in results if r['generations'] is not None]
+                if not reached:
+                    print(f"  {name:<12} reached 0/{runs}")
+                    continue
+                print(f"  {name:<12} reached {len(reached)}/{runs}  "
+                      f"median {statistics.median(r['generations'] for r in reached):>6.1f} generations  "
+                      f"{statistics.median(r['bird_steps'] for r in reached):>12.0f} bird-steps")
+        return
+    if startup:
+        for name in STARTUP_SCENARIOS:
+            r = bench_startup(name, startup)
+            print(f"{name:<11} import {r['import_seconds'] * 1000:>7.1f} ms  "
+                  f"first frame {r['first_frame_seconds'] * 1000:>7.1f} ms  "
+                  f"process {r['wall_seconds'] * 1000:>7.1f} ms  pygame {'yes' if r['pygame'] else 'no'}")
+        return
+    if policies:
+        for batch in policies:
+            latencies = bench_policies(batch, seed)
+            print(f"batch {batch:>6}  " + "  ".join(f"{name} {seconds * 1e9:>8.0f} ns"
+                                                   for name, seconds in latencies.items()))
+        return
+    for size in sizes:
+        engines = [name for name in ENGINES if name != 'objects' or size <= max_object_size]
+        results = bench_engines(size, seed, frames, engines)
+        print(f"population {size}")
+        for name, r in results.items():
+            print(f"  {name:<11} {r['frames']:>6} frames  {r['fps']:>10.1f} frames/s  "
+                  f"{r['bird_steps_per_sec']:>12.0f} bird-steps/s  checksum {r['checksum']}")
+        checksums = {r['checksum'] for r in results.values()}
+        if len(results) > 1:
+            print(f"  checksums {'match' if len(checksums) == 1 else 'DIFFER'}")
+
+        ga = bench_generations(size, seed, frames, generations)
+        phases = "  ".join(f"{name} {ms:.2f} ms" for name, ms in ga['phases_ms'].items())
+        print(f"  training    {ga['generations_per_sec']:.2f} generations/s  ({phases})")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation engines and the GA.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--frames', type=int, default=2000, help="Frame cap per generation.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--generations', type=int, default=5)
+    parser.add_argument('--max-object-size', type=int, default=500,
+                        help="Skip the (slow) object engine above this population size.")
+    parser.add_argument('--policies', type=int, nargs='+', default=None, metavar='BATCH',
+                        help="Only time one decision of each network evaluator at these batch sizes.")
+    parser.add_argument('--startup', type=int, default=None, metavar='REPEATS',
+                        help="Only time imports and first frames in fresh interpreters (median of REPEATS).")
+    parser.add_argument('--optimizers', type=int, default=None, metavar='TARGET',
+                        help="Only compare generations and bird-steps each optimizer needs to pass TARGET pipes.")
+    parser.add_argument('--runs', type=int, default=5, help="Seeds per optimizer with --optimizers.")
+    parser.add_argument('--max-generations', type=int, default=200,
+                        help="Give up on a --optimizers run after N generations.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    configure_logging(logging.WARNING)
+    main(**vars(parse_args()))
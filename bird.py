@@ -1,10 +1,65 @@
 # bird.py
-import pygame
+import logging
+import math
 import numpy as np
 from neural_network import NeuralNetwork
+from assets import get_dimensions, get_sprites
+
+logger = logging.getLogger(__name__)
+
+class Hitbox:
+    """
+    The bird's collision rectangle, without pygame.
+    Same integer geometry as the pygame.Rect it replaces: a float centery is
+    rounded half away from zero, and edges are plain attributes so the
+    per-frame collision tests don't pay for property calls.
+    """
+    __slots__ = ('left', 'top', 'width', 'height', 'right', 'bottom')
+
+    def __init__(self, left, top, width, height):
+        self.width = width
+        self.height = height
+        self.move_to(left, top)
+
+    def move_to(self, left, top):
+        self.left = left
+        self.top = top
+        self.right = left + self.width
+        self.bottom = top + self.height
+
+    @staticmethod
+    def _round(value):
+        # Not floor(abs + 0.5): the sum itself rounds up just below one half
+        magnitude = abs(value)
+        whole = math.floor(magnitude)
+        return int(math.copysign(whole + (magnitude - whole >= 0.5), value))
+
+    @property
+    def center(self):
+        return (self.left + self.width // 2, self.top + self.height // 2)
+
+    @center.setter
+    def center(self, center):
+        self.move_to(self._round(center[0]) - self.width // 2, self._round(center[1]) - self.height // 2)
+
+    @property
+    def centery(self):
+        return self.top + self.height // 2
+
+    @centery.setter
+    def centery(self, y):
+        self.top = self._round(y) - self.height // 2
+        self.bottom = self.top + self.height
+
+    def __iter__(self):
+        # (left, top, width, height), so pygame accepts it wherever a rect goes
+        return iter((self.left, self.top, self.width, self.height))
+
+    def __repr__(self):
+        return f"<Hitbox({self.left}, {self.top}, {self.width}, {self.height})>"
 
 class Bird:
-    def __init__(self, x, y, genome=None):
+    def __init__(self, x, y, genome=None, rng=None):
         self.x = x
         self.y = y
         self.velocity = 0
@@ -13,8 +68,10 @@ class Bird:
         self.is_alive = True
         self.score = 0
 
-        # Load bird animation frames without scaling
-        self.load_images(['imgs/bird1.png', 'imgs/bird2.png', 'imgs/bird3.png'])
+        # Animation frames are shared through the asset cache; the simulation
+        # itself only needs their size
+        dims = get_dimensions()
+        self.frame_count = dims.bird_frames
         self.current_frame = 0
         self.animation_speed = 0.2  # Adjust for animation speed
         self.animation_timer = 0
@@ -23,38 +80,30 @@ class Bird:
         if genome:
             self.brain = NeuralNetwork(genome['w1'], genome['b1'], genome['w2'], genome['b2'])
         else:
-            self.brain = NeuralNetwork()
+            self.brain = NeuralNetwork(rng=rng)
 
-        # Get the rect based on the first image
-        self.image = self.bird_frames[self.current_frame]
-        self.rect = self.image.get_rect(center=(self.x, self.y))
+        # Get the rect based on the sprite size
+        self.rect = Hitbox(0, 0, dims.bird_width, dims.bird_height)
+        self.rect.center = (self.x, self.y)
 
         # Flap cooldown to prevent excessive flapping
         self.flap_cooldown = 0  # Frames until next flap
 
-    def load_images(self, image_paths):
-        """Load bird images without scaling."""
-        self.bird_frames = []
-        for path in image_paths:
-            try:
-                image = pygame.image.load(path).convert_alpha()
-                self.bird_frames.append(image)
-                print(f"Loaded bird image: {path}")
-            except pygame.error as e:
-                print(f"Unable to load bird image {path}: {e}")
-                # Create a placeholder if image fails to load
-                placeholder = pygame.Surface((34, 24), pygame.SRCALPHA)
-                pygame.draw.circle(placeholder, (255, 255, 0), (17, 12), 12)  # Yellow circle
-                self.bird_frames.append(placeholder)
-                print(f"Added placeholder for bird image: {path}")
+    @property
+    def bird_frames(self):
+        return get_sprites().bird_frames
+
+    @property
+    def image(self):
+        return self.bird_frames[self.current_frame]
 
     def flap(self):
         if self.flap_cooldown == 0:
             self.velocity = self.flap_strength
             self.flap_cooldown = 20  # 20 frames cooldown (~0.33 seconds at 60 FPS)
-            print(f"Bird flapped! New velocity: {self.velocity}")
+            logger.debug("Bird flapped! New velocity: %s", self.velocity)
         else:
-            print(f"Flap on cooldown: {self.flap_cooldown} frames remaining.")
+            logger.debug("Flap on cooldown: %d frames remaining.", self.flap_cooldown)
 
     def update(self):
         # Handle flap cooldown
@@ -65,31 +114,30 @@ class Bird:
         self.velocity += self.gravity
         self.y += self.velocity
         self.rect.centery = self.y
-        print(f"Bird updated to y: {self.y}, velocity: {self.velocity}")
+        logger.debug("Bird updated to y: %s, velocity: %s", self.y, self.velocity)
 
         # Update animation
         self.animation_timer += self.animation_speed
         if self.animation_timer >= 1:
             self.animation_timer = 0
-            self.current_frame = (self.current_frame + 1) % len(self.bird_frames)
-            self.image = self.bird_frames[self.current_frame]
-            print(f"Switched to bird frame: {self.current_frame + 1}")
+            self.current_frame = (self.current_frame + 1) % self.frame_count
+            logger.debug("Switched to bird frame: %d", self.current_frame + 1)
 
     def decide(self, inputs):
         output = self.brain.forward(inputs)
-        print(f"Bird decision inputs: {inputs}, output: {output}")
+        logger.debug("Bird decision inputs: %s, output: %s", inputs, output)
         if output > 0.5:
             self.flap()
 
     def get_genome(self):
         return self.brain.get_parameters()
 
-    def mutate(self, mutation_rate=0.1):
-        self.brain.mutate(mutation_rate)
-        print("Bird genome mutated.")
+    def mutate(self, mutation_rate=0.1, rng=None):
+        self.brain.mutate(mutation_rate, rng)
+        logger.debug("Bird genome mutated.")
 
     def draw(self, screen):
         """Draw the bird with its current animation frame."""
-        screen.blit(self.image, self.rect)
+        screen.blit(self.image, (self.rect.left, self.rect.top))
         # Optional: Draw rect for debugging
         # pygame.draw.rect(screen, (255, 0, 0), self.rect, 1)
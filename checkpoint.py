@@ -0,0 +1,231 @@
+# checkpoint.py
+import hashlib
+import json
+import logging
+import os
+import pickle
+import queue
+import threading
+import numpy as np
+from neural_network import PARAMETER_COUNT, GenomeMatrix, unflatten_genome
+
+logger = logging.getLogger(__name__)
+
+GENOMES_FILE = 'genomes.bin'
+FITNESS_FILE = 'fitness.bin'
+INDEX_FILE = 'index.jsonl'
+
+def best_fitness_path(path):
+    """Sidecar file recording the fitness of the genome pickled at `path`."""
+    return path + '.fitness.json'
+
+def read_best_fitness(path):
+    """
+    Recorded fitness of the genome pickled at `path`, or None when it is
+    unknown: no sidecar, or the pickle was rewritten without one since.
+    """
+    try:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with open(best_fitness_path(path)) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record.get('sha256') != digest:
+        return None
+    return record['fitness']
+
+def write_best(path, genome, fitness):
+    """Pickle a best genome dict to `path` and record its fitness beside it."""
+    data = pickle.dumps(genome)
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(best_fitness_path(path), 'w') as f:
+        json.dump(dict(fitness=float(fitness), sha256=hashlib.sha256(data).hexdigest()), f)
+
+class GenomeArchive:
+    """
+    Append-only archive of every evaluated generation, kept in a directory:
+    - genomes.bin: the flat genome rows of all generations back to back
+      (float64 by default, PARAMETER_COUNT values per row, so a resumed run
+      breeds from exactly the same parents)
+    - fitness.bin: one float64 fitness per row
+    - index.jsonl: one line per generation with its row offset and count,
+      best/mean fitness, course seeds and the GA's RNG state
+    Reading any generation memory-maps just its rows. The index line is
+    written last, so a crash mid-write loses at most the generation being
+    written; the leftover bytes are cut off when the archive is reopened.
+    Resuming from an older generation appends the new history after the old
+    one; looking a generation up by number finds its most recent copy.
+    read_only=True opens an existing archive without touching it (e.g.
+    while training is still appending to it): nothing is created or cut
+    off, and bytes past the last complete index record are ignored.
+    """
+    def __init__(self, path, dtype=np.float64, read_only=False):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.read_only = read_only
+        if read_only:
+            if not os.path.isdir(path):
+                raise FileNotFoundError(f"No checkpoint archive at {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+        self.records, index_size = self._read_index()
+        if not read_only:
+            self._truncate(index_size)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_index(self):
+        """Complete index records and their size in bytes."""
+        records, size = [], 0
+        if not os.path.exists(self._file(INDEX_FILE)):
+            return records, size
+        with open(self._file(INDEX_FILE), 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    logger.warning("Ignoring a partly written checkpoint record.")
+                    break
+                records.append(json.loads(line))
+                size += len(line)
+        return records, size
+
+    def _truncate(self, index_size):
+        """Drop data past the last complete generation."""
+        rows = self.records[-1]['offset'] + self.records[-1]['count'] if self.records else 0
+        sizes = {GENOMES_FILE: rows * PARAMETER_COUNT * self.dtype.itemsize,
+                 FITNESS_FILE: rows * np.dtype(np.float64).itemsize,
+                 INDEX_FILE: index_size}
+        for name, size in sizes.items():
+            with open(self._file(name), 'ab') as f:
+                if f.tell() > size:
+                    f.truncate(size)
+
+    def __len__(self):
+        return len(self.records)
+
+    def generations(self):
+        """Numbers of the archived generations, oldest first."""
+        return [record['generation'] for record in self.records]
+
+    def record(self, generation=None):
+        """Index record of a generation (the latest when None)."""
+        if not self.records:
+            raise LookupError(f"No generations in checkpoint archive {self.path}")
+        if generation is None:
+            return self.records[-1]
+        for record in reversed(self.records):
+            if record['generation'] == generation:
+                return record
+        raise LookupError(f"Generation {generation} is not in checkpoint archive {self.path}")
+
+    def append(self, generation, genomes, fitness, course_seeds=None, rng_state=None):
+        """Write one evaluated generation. Blocks; see CheckpointWriter."""
+        if self.read_only:
+            raise ValueError(f"Checkpoint archive {self.path} is open read-only")
+        rows = np.ascontiguousarray(genomes, dtype=self.dtype)
+        fitness = np.ascontiguousarray(fitness, dtype=np.float64)
+        offset = self.records[-1]['offset'] + self.records[-1]['count'] if self.records else 0
+        best_index = int(np.argmax(fitness))
+        record = dict(generation=int(generation), offset=offset, count=len(rows),
+                      best_index=best_index, best_fitness=float(fitness[best_index]),
+                      mean_fitness=float(fitness.mean()),
+                      course_seeds=[int(seed) for seed in course_seeds or []],
+                      rng_state=rng_state)
+        with open(self._file(GENOMES_FILE), 'ab') as f:
+            f.write(rows.tobytes())
+        with open(self._file(FITNESS_FILE), 'ab') as f:
+            f.write(fitness.tobytes())
+        with open(self._file(INDEX_FILE), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        self.records.append(record)
+        logger.debug("Checkpointed generation %d (%d genomes).", generation, len(rows))
+
+    def genomes(self, generation=None):
+        """Memory-mapped genome rows of a generation (read-only, archive dtype)."""
+        record = self.record(generation)
+        row_bytes = PARAMETER_COUNT * self.dtype.itemsize
+        return np.memmap(self._file(GENOMES_FILE), dtype=self.dtype, mode='r',
+                         offset=record['offset'] * row_bytes, shape=(record['count'], PARAMETER_COUNT))
+
+    def fitness(self, generation=None):
+        record = self.record(generation)
+        return np.memmap(self._file(FITNESS_FILE), dtype=np.float64, mode='r',
+                         offset=record['offset'] * np.dtype(np.float64).itemsize, shape=(record['count'],))
+
+    def load(self, generation=None):
+        """(GenomeMatrix, fitness array, record) of a generation, copied into memory."""
+        record = self.record(generation)
+        return (GenomeMatrix(np.array(self.genomes(record['generation']), dtype=np.float64)),
+                np.array(self.fitness(record['generation'])), record)
+
+    def elite(self, generation=None):
+        """Best genome of a generation as a dict, reading only its row."""
+        record = self.record(generation)
+        row = self.genomes(record['generation'])[record['best_index']]
+        return unflatten_genome(np.array(row, dtype=np.float64))
+
+class CheckpointWriter:
+    """
+    Background thread that does the checkpoint I/O, so the training loop
+    never waits for the disk. Jobs run in submission order; an I/O error is
+    re-raised on the next call into the writer.
+    """
+    def __init__(self, archive=None):
+        self.archive = archive
+        self.jobs = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                job()
+            except Exception as e:
+                logger.error("Checkpoint write failed: %s", e)
+                self.error = e
+            finally:
+                self.jobs.task_done()
+
+    def _submit(self, job):
+        if self.error is not None:
+            raise self.error
+        self.jobs.put(job)
+
+    def append(self, generation, genomes, fitness, course_seeds=None, rng_state=None):
+        """Queue a generation for the archive. The arrays are copied right away."""
+        if self.archive is None:
+            return
+        rows = np.array(genomes, dtype=self.archive.dtype)
+        fitness = np.array(fitness, dtype=np.float64)
+        self._submit(lambda: self.archive.append(generation, rows, fitness, course_seeds, rng_state))
+
+    def save_best(self, path, genome, fitness):
+        """Queue a pickle of the best genome dict and a record of its fitness (see write_best)."""
+        def write():
+            write_best(path, genome, fitness)
+            logger.debug("Best genome saved.")
+        self._submit(write)
+
+    def flush(self):
+        """Wait until every queued write is on disk."""
+        self.jobs.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.jobs.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
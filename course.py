@@ -0,0 +1,79 @@
+# course.py
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def gap_bounds(screen_height=700, base_height=112, gap=180):
+    """
+    Lowest and highest valid gap center, as in Pipe.set_height.
+    When gap + base don't fit, both are the fallback center.
+    """
+    half_gap = gap // 2
+    min_center = half_gap
+    max_center = (screen_height - base_height) - half_gap
+    if max_center < min_center:
+        logger.warning("Gap + base too large. Using fallback center.")
+        min_center = max_center = (screen_height - base_height) // 2
+    return min_center, max_center
+
+class PipeCourse:
+    """
+    The gap centers of one seeded pipe course, precomputed into a compact
+    int16 array. The n-th pipe to spawn always gets center(n), so every
+    generation, engine and worker that uses the same seed plays the same
+    course, and a spawn is an O(1) lookup.
+    The array is extended lazily, one block at a time, as birds get further.
+    """
+    def __init__(self, seed=None, min_center=90, max_center=498, block_size=1024):
+        self.seed = seed
+        self.min_center = min_center
+        self.max_center = max_center
+        self.block_size = block_size
+        # seed may also be an np.random.Generator, which is used as is
+        self.rng = np.random.default_rng(seed)
+        self.centers = np.empty(0, dtype=np.int16)
+        self.mapped = False
+
+    @classmethod
+    def for_screen(cls, seed=None, screen_height=700, base_height=112, gap=180, **kwargs):
+        return cls(seed, *gap_bounds(screen_height, base_height, gap), **kwargs)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-map a course written by save(). Very long courses are paged in
+        by the OS instead of being held in memory; past its end a mapped
+        course starts over from the first pipe.
+        """
+        course = cls.__new__(cls)
+        course.seed = None
+        course.centers = np.load(path, mmap_mode='r')
+        course.min_center = int(course.centers.min())
+        course.max_center = int(course.centers.max())
+        course.mapped = True
+        return course
+
+    def save(self, path, length):
+        """Write the first `length` centers to a .npy file for open()."""
+        self.extend(length)
+        np.save(path, self.centers[:length])
+
+    def extend(self, length):
+        """Make sure at least `length` centers are computed."""
+        missing = length - len(self.centers)
+        if missing <= 0 or self.mapped:
+            return
+        blocks = -(-missing // self.block_size)
+        new = self.rng.integers(self.min_center, self.max_center + 1, size=blocks * self.block_size)
+        self.centers = np.concatenate([self.centers, new.astype(np.int16)])
+
+    def center(self, index):
+        """Gap center of the index-th pipe of the course."""
+        if self.mapped:
+            return int(self.centers[index % len(self.centers)])
+        if index >= len(self.centers):
+            self.extend(index + 1)
+        return int(self.centers[index])
+
+    __getitem__ = center
@@ -0,0 +1,377 @@
+# eval_server.py
+"""
+Score genomes for other tools over a local socket.
+
+    python eval_server.py --tcp 127.0.0.1:6100 --max-batch-size 256 --max-wait 0.005
+    python eval_server.py --unix /tmp/flappy.sock
+
+The protocol is one JSON object per line. An evaluation request
+
+    {"id": 1, "genomes": [[...31 floats...], {"w1": ..., "b1": ..., "w2": ..., "b2": ...}],
+     "course_seeds": [0], "max_frames": 5000}
+
+takes flat genomes (NeuralNetwork's w1/b1/w2/b2 order, see flatten_genome)
+or parameter dicts. It is answered by one {"id", "index", "fitness"} line
+per genome, as soon as that genome has been scored, and a final
+{"id", "done": true} line. {"op": "metrics"} returns the server metrics.
+
+Genomes from concurrent requests are pooled: the server waits up to
+`max_wait` seconds (or until `max_batch_size` genomes are queued) and then
+plays them in one headless PopulationSimulator run per course set, under
+the same rules as Game. Each bird's score depends only on its own genome
+and course, so batching never changes a result.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import stat
+import time
+from collections import deque, namedtuple
+import numpy as np
+from assets import simulator_options
+from neural_network import PARAMETER_COUNT, GenomeMatrix, PARAMETER_SHAPES, flatten_genome
+from parallel import evaluate_chunk
+from utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# One queued genome: the batch it can join is keyed by (course_seeds, limits)
+Pending = namedtuple('Pending', ['row', 'key', 'future', 'enqueued'])
+
+def genome_row(genome):
+    """A flat float64 row from a flat list or a {'w1', 'b1', 'w2', 'b2'} dict."""
+    if isinstance(genome, dict):
+        row = flatten_genome({key: np.asarray(genome[key], dtype=np.float64) for key, _ in PARAMETER_SHAPES})
+    else:
+        row = np.asarray(genome, dtype=np.float64).ravel()
+    if row.shape != (PARAMETER_COUNT,):
+        raise ValueError(f"A genome has {PARAMETER_COUNT} parameters, got {row.size}")
+    return row
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def request_limits(message):
+    """(course_seeds, max_frames, max_score) of a request, or ValueError."""
+    course_seeds = message.get('course_seeds', [0])
+    if not isinstance(course_seeds, list) or not course_seeds:
+        raise ValueError("course_seeds must be a non-empty list")
+    if not all(is_int(seed) and seed >= 0 for seed in course_seeds):
+        raise ValueError("course seeds must be non-negative integers")
+    limits = []
+    for name in ('max_frames', 'max_score'):
+        value = message.get(name)
+        if value is not None and not (is_int(value) and value >= 0):
+            raise ValueError(f"{name} must be a non-negative integer or null")
+        limits.append(value)
+    return course_seeds, *limits
+
+class ServerMetrics:
+    """Queue depth, batch fill and request latency of an EvaluationServer."""
+    def __init__(self, max_batch_size, window=10000):
+        self.max_batch_size = max_batch_size
+        self.requests = 0
+        self.genomes = 0
+        self.batches = 0
+        self.batched_genomes = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=window)  # Seconds from enqueue to result, per genome
+
+    def record_batch(self, batch, finished):
+        self.batches += 1
+        self.batched_genomes += len(batch)
+        self.latencies.extend(finished - pending.enqueued for pending in batch)
+
+    def snapshot(self, queue_depth):
+        latencies = np.array(self.latencies)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (None, None)
+        mean_batch = self.batched_genomes / self.batches if self.batches else 0.0
+        return dict(requests=self.requests, genomes=self.genomes, batches=self.batches,
+                    queue_depth=queue_depth, max_queue_depth=self.max_queue_depth,
+                    mean_batch_size=mean_batch, batch_fill_ratio=mean_batch / self.max_batch_size,
+                    latency_p50_ms=None if p50 is None else float(p50),
+                    latency_p99_ms=None if p99 is None else float(p99))
+
+class EvaluationServer:
+    """
+    asyncio server that micro-batches genome evaluations.
+    At most one batch is simulated at a time (in a worker thread, so the
+    event loop keeps accepting requests); everything that arrives
+    meanwhile makes up the next batch.
+    - max_batch_size: genomes per batch.
+    - max_wait: seconds a batch waits for more genomes once it has one.
+    - max_frames caps every evaluation; requests can only lower it.
+    """
+    def __init__(self, max_batch_size=256, max_wait=0.005, max_frames=10000, sim_options=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_frames = max_frames
+        self.sim_options = sim_options or simulator_options()
+        self.metrics = ServerMetrics(max_batch_size)
+        self.queue = None
+        self.server = None
+        self.batcher = None
+
+    async def start(self, host='127.0.0.1', port=6100, path=None):
+        """Listen on a Unix socket at `path`, or on TCP host:port."""
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self.run_batches())
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        for sock in self.server.sockets:
+            logger.info("Evaluation server listening on %s.", sock.getsockname())
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+
+    def submit(self, row, course_seeds, max_frames=None, max_score=None):
+        """Queue one genome; returns a future of its fitness."""
+        if self.max_frames is not None:
+            max_frames = self.max_frames if max_frames is None else min(max_frames, self.max_frames)
+        future = asyncio.get_running_loop().create_future()
+        key = (tuple(int(seed) for seed in course_seeds), max_frames, max_score)
+        self.queue.put_nowait(Pending(row, key, future, time.perf_counter()))
+        self.metrics.genomes += 1
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.queue.qsize())
+        return future
+
+    async def next_batch(self):
+        """Wait for a genome, then gather more until the batch is full or max_wait is up."""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if self.queue.empty():
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self.queue.get_nowait())
+        return batch
+
+    def evaluate_batch(self, batch):
+        """
+        Fitness per queued genome: one simulation for each course set and
+        limits in the batch. A group that fails gets its exception instead,
+        without touching the other groups.
+        """
+        groups = {}
+        for i, pending in enumerate(batch):
+            groups.setdefault(pending.key, []).append(i)
+        fitness = [None] * len(batch)
+        for (course_seeds, max_frames, max_score), indices in groups.items():
+            rows = np.stack([batch[i].row for i in indices])
+            try:
+                scores, _ = evaluate_chunk(rows, list(course_seeds), self.sim_options,
+                                           limits=dict(max_frames=max_frames, max_score=max_score))
+                scores = scores.tolist()
+            except Exception as e:
+                logger.exception("Group of %d genomes on courses %s failed.", len(indices), list(course_seeds))
+                scores = [e] * len(indices)
+            for i, score in zip(indices, scores):
+                fitness[i] = score
+        return fitness
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            try:
+                fitness = await loop.run_in_executor(None, self.evaluate_batch, batch)
+            except Exception as e:
+                logger.exception("Batch of %d genomes failed.", len(batch))
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                continue
+            self.metrics.record_batch(batch, time.perf_counter())
+            for pending, score in zip(batch, fitness):
+                if pending.future.done():
+                    continue
+                if isinstance(score, Exception):
+                    pending.future.set_exception(score)
+                else:
+                    pending.future.set_result(score)
+            logger.debug("Evaluated a batch of %d genomes, %d still queued.", len(batch), self.queue.qsize())
+
+    async def handle_connection(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def send(message):
+            async with lock:
+                writer.write((json.dumps(message) + '\n').encode())
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except ValueError as e:
+                    await send(dict(error=f"Invalid JSON: {e}"))
+                    continue
+                if not isinstance(message, dict):
+                    await send(dict(error="A request must be a JSON object."))
+                    continue
+                if message.get('op') == 'metrics':
+                    await send(dict(id=message.get('id'), metrics=self.metrics.snapshot(self.queue.qsize())))
+                    continue
+                # Each request streams its results on its own, so a connection can pipeline several
+                task = asyncio.create_task(self.handle_request(message, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            logger.debug("Client disconnected.")
+        finally:
+            writer.close()
+
+    async def handle_request(self, message, send):
+        request_id = message.get('id')
+        try:
+            rows = [genome_row(genome) for genome in message['genomes']]
+            # Checked here: a bad seed or limit would otherwise fail the whole shared batch
+            course_seeds, max_frames, max_score = request_limits(message)
+        except (KeyError, TypeError, ValueError) as e:
+            await send(dict(id=request_id, error=f"Bad request: {e}"))
+            return
+        self.metrics.requests += 1
+        futures = {self.submit(row, course_seeds, max_frames, max_score): index
+                   for index, row in enumerate(rows)}
+        waiting = set(futures)
+        while waiting:
+            done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                if future.exception() is not None:
+                    await send(dict(id=request_id, index=futures[future], error=str(future.exception())))
+                else:
+                    await send(dict(id=request_id, index=futures[future], fitness=future.result()))
+        await send(dict(id=request_id, done=True, count=len(rows)))
+
+class EvaluationClient:
+    """
+    Blocking client for notebooks and scripts.
+
+        with EvaluationClient(('127.0.0.1', 6100)) as client:
+            fitness = client.evaluate(genomes, course_seeds=[0, 1])
+
+    `address` is a (host, port) pair or the path of a Unix socket.
+    """
+    def __init__(self, address=('127.0.0.1', 6100)):
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.connect(address)
+        self.file = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def request(self, message):
+        self.next_id += 1
+        message = dict(message, id=self.next_id)
+        self.file.write((json.dumps(message) + '\n').encode())
+        self.file.flush()
+        return self.next_id
+
+    def receive(self, check=True):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Evaluation server closed the connection.")
+        message = json.loads(line)
+        if check and 'error' in message:
+            raise RuntimeError(message['error'])
+        return message
+
+    def evaluate(self, genomes, course_seeds=(0,), max_frames=None, max_score=None):
+        """
+        Fitness of every genome: rows of an (N, PARAMETER_COUNT) array, a
+        GenomeMatrix, or parameter dicts. With several course seeds each
+        genome scores its mean over the courses.
+        """
+        if isinstance(genomes, GenomeMatrix):
+            genomes = genomes.data
+        genomes = [genome_row(genome).tolist() for genome in genomes]
+        self.request(dict(genomes=genomes, course_seeds=list(course_seeds),
+                          max_frames=max_frames, max_score=max_score))
+        fitness = [None] * len(genomes)
+        errors = []
+        while not (message := self.receive(check=False)).get('done'):
+            if 'index' not in message:
+                # The whole request was rejected; no "done" line follows
+                raise RuntimeError(message['error'])
+            if 'error' in message:
+                errors.append(f"genome {message['index']}: {message['error']}")
+            else:
+                fitness[message['index']] = message['fitness']
+        # Raised only after "done", so the next request doesn't read this one's lines
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return fitness
+
+    def metrics(self):
+        self.request(dict(op='metrics'))
+        return self.receive()['metrics']
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def remove_stale_socket(path):
+    """Unlink the socket an earlier server left at `path`; any other file there is an error."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket.")
+    os.remove(path)
+
+async def serve(host='127.0.0.1', port=6100, path=None, max_batch_size=256, max_wait=0.005, max_frames=10000):
+    server = EvaluationServer(max_batch_size, max_wait, max_frames)
+    await server.start(host, port, path)
+    await server.serve_forever()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching genome evaluation server.")
+    parser.add_argument('--tcp', default='127.0.0.1:6100', metavar='HOST:PORT')
+    parser.add_argument('--unix', default=None, metavar='PATH', help="Listen on a Unix socket instead of TCP.")
+    parser.add_argument('--max-batch-size', type=int, default=256, help="Genomes simulated together at most.")
+    parser.add_argument('--max-wait', type=float, default=0.005,
+                        help="Seconds a batch waits for more genomes before it runs.")
+    parser.add_argument('--max-frames', type=int, default=10000,
+                        help="Frame cap of every evaluation (requests can only lower it).")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = parse_args()
+    configure_logging(options.log_level)
+    host, port = options.tcp.rsplit(':', 1)
+    if options.unix:
+        try:
+            remove_stale_socket(options.unix)
+        except FileExistsError as e:
+            raise SystemExit(str(e))
+    asyncio.run(serve(host, int(port), options.unix, options.max_batch_size, options.max_wait,
+                      options.max_frames))
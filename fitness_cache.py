@@ -0,0 +1,105 @@
+# fitness_cache.py
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One on-disk record: 16-byte key + fitness
+RECORD_DTYPE = np.dtype([('key', 'V16'), ('fitness', '<f8')])
+
+def cacheable(result):
+    """
+    Whether a generation's scores depend only on each genome and its course.
+    Frame and score caps are part of the key; a wall-clock budget or an
+    identical-survivor stop depend on the machine or on the rest of the
+    population, so those scores are not cached.
+    """
+    return result.reason is None or result.reason.startswith(("frame cap", "score cap"))
+
+class FitnessCache:
+    """
+    LRU cache of fitness scores keyed by a hash of the flat genome bytes, the
+    course seed(s) played, the simulation parameters and the frame/score
+    caps. The simulation is deterministic, so a genome that was already
+    scored on the same course (the elite, unmutated clones, and everything
+    under --fixed-courses) doesn't need to fly again.
+    With `path`, new entries are appended to a binary file and reloaded on
+    the next start. Keys don't cover the game code itself: delete the file
+    after changing the rules.
+    """
+    def __init__(self, capacity=100000, path=None, sim_options=None):
+        self.capacity = capacity
+        self.path = path
+        self.context = repr(sorted((sim_options or {}).items())).encode()
+        self.entries = OrderedDict()
+        self.pending = []
+        self.hits = self.misses = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        records = np.fromfile(self.path, dtype=RECORD_DTYPE)
+        for record in records[-self.capacity:]:
+            self.entries[record['key'].tobytes()] = float(record['fitness'])
+            self.entries.move_to_end(record['key'].tobytes())
+        if len(records) > 2 * self.capacity:
+            # Compact the file down to what the cache still holds
+            self.write(self.entries.items(), mode='wb')
+        logger.info("Loaded %d cached fitness scores from %s.", len(self.entries), self.path)
+
+    def write(self, items, mode='ab'):
+        items = list(items)
+        records = np.empty(len(items), dtype=RECORD_DTYPE)
+        for record, (key, fitness) in zip(records, items):
+            record['key'] = key
+            record['fitness'] = fitness
+        with open(self.path, mode) as f:
+            f.write(records.tobytes())
+
+    def keys(self, genomes, course_seeds, limits=None):
+        """One key per genome row for the given course seeds and caps."""
+        suffix = self.context + repr((list(course_seeds), limits)).encode()
+        return [hashlib.blake2b(row.tobytes() + suffix, digest_size=16).digest()
+                for row in np.ascontiguousarray(genomes, dtype=np.float64)]
+
+    def lookup(self, keys):
+        """Cached fitness per key, None where it is unknown."""
+        found = []
+        for key in keys:
+            fitness = self.entries.get(key)
+            if fitness is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                # Single-course scores are pipe counts; keep them ints like fresh ones
+                fitness = int(fitness) if fitness.is_integer() else fitness
+            found.append(fitness)
+        return found
+
+    def store(self, keys, scores):
+        for key, fitness in zip(keys, scores):
+            if key not in self.entries and self.path:
+                self.pending.append((key, float(fitness)))
+            self.entries[key] = float(fitness)
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def flush(self):
+        """Append the entries added since the last flush to the backing file."""
+        if self.path and self.pending:
+            self.write(self.pending)
+            self.pending = []
+
+    def generation_stats(self):
+        """(hits, misses) since the last call."""
+        stats = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        return stats
+
+    def close(self):
+        self.flush()
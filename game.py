@@ -1,168 +1,386 @@
-import pygame
+import logging
+import time
 import numpy as np
 from bird import Bird
 from pipe import Pipe
+from simulation import PipeQueue, PopulationSimulator
+from neural_network import PopulationBrain, flatten_genome
+from assets import get_dimensions, get_sprites, simulator_options
+from course import PipeCourse
+from profiling import NULL_PROFILER
+from scheduler import EvaluationScheduler, GenerationResult
+from utils import get_rng
+
+logger = logging.getLogger(__name__)
 
 class Game:
     best_record = 0
-    def __init__(self, population, screen):
+    # Simulation steps per drawn frame that the keyboard steps through
+    SPEEDS = (1, 2, 5, 10, 25, 50, 100)
+
+    def __init__(self, population, screen=None, screen_width=500, screen_height=700,
+                 engine='objects', rng=None, renderer=None, profiler=None, steps_per_frame=1,
+                 uncapped=False, fps=60):
+        # screen=None runs the game headless: no display surface, no drawing
+        # and no frame cap, so generations run as fast as the CPU allows.
+        # engine='vectorized' runs headless generations on PopulationSimulator.
+        # rng draws the course seed of every generation that isn't given one.
+        # renderer (e.g. a DirtyRectRenderer) replaces the full redraw + flip.
+        # profiler (see profiling.Profiler) collects per-phase timings.
+        # A drawn generation runs steps_per_frame simulation steps per frame
+        # at `fps` frames a second; uncapped simulates flat out and draws a
+        # frame whenever 1/fps seconds have passed. Both change at runtime
+        # with the keyboard (see handle_key).
+        # pygame is only imported once there is a screen to draw on.
+        if engine not in ('objects', 'vectorized'):
+            raise ValueError(f"Unknown engine: {engine!r}")
+        self.engine = engine
         self.screen = screen
-        self.screen_width = screen.get_width()
-        self.screen_height = screen.get_height()
-        self.clock = pygame.time.Clock()
+        self.renderer = renderer
+        self.profiler = profiler or NULL_PROFILER
+        if screen is not None:
+            screen_width = screen.get_width()
+            screen_height = screen.get_height()
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.steps_per_frame = steps_per_frame
+        self.uncapped = uncapped
+        self.fps = fps
+        self.next_draw = 0.0
+        self.clock = None
+        if screen is not None:
+            import pygame
+            self.clock = pygame.time.Clock()
+        self.rng = get_rng(rng)
         self.population = population
         self.gap = 200  # Distance between pipes
         self.gaps_passed = 0
+        self.bird_x = 100  # Every bird flies at this x
         
 
         # We'll load images (including base) first
         self.load_images()
 
-        # Now that self.base is loaded, we can pass its height to Pipe
-        self.pipes = [Pipe(self.screen_width + 200, self.screen_height, self.base.get_height())]
+        # Now that the base height is known, we can pass it to Pipe
+        self.new_course()
 
         # Base movement variables
         self.base_x = 0
         self.base_speed = 5  # Speed at which the base moves
 
-        # Font for displaying stats
-        self.font = pygame.font.SysFont('Arial', 24)
+        # Font for displaying stats (created on first render)
+        self.font = None
         self.current_generation = 1
         self.best_fitness = 0
 
     def load_images(self):
-        """Load background and base images without scaling."""
-        try:
-            self.bg = pygame.image.load('imgs/bg.png').convert()
-            # Ensure the background fits the screen
-            self.bg = pygame.transform.scale(self.bg, (self.screen_width, self.screen_height))
-            print("Loaded background image.")
-        except pygame.error as e:
-            print(f"Unable to load background image: {e}")
-            self.bg = pygame.Surface((self.screen_width, self.screen_height))
-            self.bg.fill((135, 206, 235))  # Sky blue fallback
-
-        try:
-            self.base = pygame.image.load('imgs/base.png').convert_alpha()
-            # Scale base to match screen width
-            self.base = pygame.transform.scale(self.base, (self.screen_width, self.base.get_height()))
-            print("Loaded base image.")
-        except pygame.error as e:
-            print(f"Unable to load base image: {e}")
-            self.base = pygame.Surface((self.screen_width, 100), pygame.SRCALPHA)
-            pygame.draw.rect(self.base, (222, 184, 135), self.base.get_rect())  # Sandy brown fallback
-
-    def reset(self, population):
+        """Take background and base from the shared asset cache."""
+        self.base_height = get_dimensions().base_height
+        self.base_width = self.screen_width  # Base is scaled to the screen width
+        if self.screen is None:
+            # Headless: nothing is drawn, so no surfaces are needed
+            self.bg = None
+            self.base = None
+        else:
+            sprites = get_sprites(self.screen_width, self.screen_height)
+            self.bg = sprites.bg
+            self.base = sprites.base
+
+    def new_course(self, seed=None, course=None):
+        """
+        Start a pipe course: a seed, or a precomputed PipeCourse to replay.
+        The same course gives the same gaps on every engine (objects,
+        vectorized, worker processes).
+        """
+        if course is None:
+            if seed is None:
+                seed = int(self.rng.integers(0, 2**63 - 1))
+            course = PipeCourse.for_screen(seed, self.screen_height, self.base_height)
+        self.course = course
+        self.pipes_spawned = 0
+        dims = get_dimensions()
+        bird_left = self.bird_x - dims.bird_width // 2
+        self.pipes = PipeQueue(dims.pipe_width, bird_left, bird_left + dims.bird_width, self.bird_x)
+        self.pipes.append(self.new_pipe())
+
+    def new_pipe(self):
+        # Pass the base height so the gap stays above it
+        gap_center = self.course.center(self.pipes_spawned)
+        self.pipes_spawned += 1
+        return Pipe(self.screen_width + 200, self.screen_height, self.base_height, gap_center=gap_center)
+
+    def reset(self, population, seed=None, course=None):
         self.population = population
         self.gaps_passed = 0
-        # Recreate pipes, passing base height
-        self.pipes = [Pipe(self.screen_width + 200, self.screen_height, self.base.get_height())]
+        # Recreate pipes on a new (or the given) course
+        self.new_course(seed, course)
         self.base_x = 0
         for bird in self.population:
             bird.y = 350
             bird.velocity = 0
             bird.is_alive = True
             bird.score = 0
-        print("Game reset with new population.")
-
-    def run_generation(self):
-        run = True
-        while run and any(bird.is_alive for bird in self.population):
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-
-            # Draw background
-            self.screen.blit(self.bg, (0, 0))
-
-            # Draw and move base
-            self.screen.blit(self.base, (self.base_x, self.screen_height - self.base.get_height()))
-            self.screen.blit(self.base, (self.base_x + self.base.get_width(),
-                                         self.screen_height - self.base.get_height()))
-            self.base_x -= self.base_speed
-            if self.base_x <= -self.base.get_width():
-                self.base_x = 0
-
-            # Move and draw pipes
-            add_pipe = False
-            remove_pipes = []
-            for pipe in self.pipes:
-                pipe.move()
-                pipe.draw(self.screen)
-                for bird in self.population:
-                    if bird.is_alive and pipe.collide(bird):
-                        bird.is_alive = False
-                        print(f"Bird at y: {bird.y} collided with pipe.")
-                if pipe.off_screen():
-                    remove_pipes.append(pipe)
-                if not pipe.passed and pipe.x < self.screen_width // 2:
-                    pipe.passed = True
-                    add_pipe = True
-                    # Increment score for each alive bird
-                    for bird in self.population:
-                        if bird.is_alive:
-                            bird.score += 1
-                            print(f"Bird at y: {bird.y} passed a pipe. Score: {bird.score}")
-
-            if add_pipe:
-                print("Adding new pipe.")
-                self.gaps_passed += 1
-                if self.gaps_passed > Game.best_record:  # Update class-level best record
-                    Game.best_record = self.gaps_passed
-                
-                # Pass the base height here too
-                self.pipes.append(Pipe(self.screen_width + 200, self.screen_height, self.base.get_height()))
-
-            for pipe in remove_pipes:
-                self.pipes.remove(pipe)
-
-            # Update and draw birds
+        logger.debug("Game reset with new population.")
+
+    def handle_events(self):
+        """Keep the window responsive and exit cleanly when it is closed."""
+        import pygame
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                exit()
+            elif event.type == pygame.KEYDOWN:
+                self.handle_key(event.key)
+
+    def handle_key(self, key):
+        """
+        Speed controls: Up/+ and Down/- step through SPEEDS, U toggles
+        uncapped mode and 1 goes back to real time.
+        """
+        import pygame
+        if key in (pygame.K_UP, pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+            faster = [speed for speed in self.SPEEDS if speed > self.steps_per_frame]
+            self.steps_per_frame = faster[0] if faster else self.steps_per_frame
+            self.uncapped = False
+        elif key in (pygame.K_DOWN, pygame.K_MINUS, pygame.K_KP_MINUS):
+            slower = [speed for speed in self.SPEEDS if speed < self.steps_per_frame]
+            self.steps_per_frame = slower[-1] if slower else self.steps_per_frame
+            self.uncapped = False
+        elif key == pygame.K_u:
+            self.uncapped = not self.uncapped
+        elif key == pygame.K_1:
+            self.steps_per_frame = 1
+            self.uncapped = False
+        else:
+            return
+        logger.info("Simulation speed: %s.", self.speed_label)
+
+    @property
+    def speed_label(self):
+        return "uncapped" if self.uncapped else f"{self.steps_per_frame}x"
+
+    def frame_due(self, frames):
+        """Whether the step about to run (the `frames`-th of the generation) ends with a drawn frame."""
+        if self.uncapped:
+            now = time.perf_counter()
+            if now < self.next_draw:
+                return False
+            self.next_draw = now + 1 / self.fps
+            return True
+        return (frames + 1) % self.steps_per_frame == 0
+
+    def draw_background(self):
+        """Draw the background and the two base strips."""
+        self.screen.blit(self.bg, (0, 0))
+        self.screen.blit(self.base, (self.base_x, self.screen_height - self.base_height))
+        self.screen.blit(self.base, (self.base_x + self.base_width,
+                                     self.screen_height - self.base_height))
+
+    def run_generation(self, render=None, scheduler=None):
+        """
+        Run the current population until every bird is dead, or until the
+        scheduler's budget runs out. Returns a GenerationResult.
+        - render=None draws the generation whenever the game has a screen.
+        - render=False steps physics, collisions and scoring only: no drawing,
+          no display.flip() and no clock.tick() frame cap.
+        - When rendering, only every steps_per_frame-th step is drawn (or, in
+          uncapped mode, one step per 1/fps seconds), and events are polled
+          once per drawn frame.
+        """
+        if render is None:
+            render = self.screen is not None
+        elif render and self.screen is None:
+            raise ValueError("Cannot render a headless game (screen is None).")
+        if scheduler is None:
+            scheduler = EvaluationScheduler()
+
+        if not render and self.engine == 'vectorized':
+            return self.run_vectorized(scheduler)
+
+        if render and self.renderer is not None:
+            self.renderer.reset(self)
+
+        start = time.perf_counter()
+        self.next_draw = start
+        frames = 0
+        reason = None
+        while any(bird.is_alive for bird in self.population):
+            reason = scheduler.should_stop(frames, self.gaps_passed, time.perf_counter() - start)
+            if reason is None and scheduler.check_identical(frames) and self.survivors_identical():
+                reason = "identical survivors"
+            if reason is not None:
+                break
+
+            draw = render and self.frame_due(frames)
+            if self.screen is not None and (draw or not render):
+                self.profiler.start()
+                self.handle_events()
+                self.profiler.lap('events')
+
+            self.step(draw and self.renderer is None)
+            frames += 1
+
+            if draw:
+                if self.renderer is not None:
+                    self.renderer.draw(self)
+                else:
+                    import pygame
+                    pygame.display.flip()
+                self.profiler.lap('display')
+                if self.uncapped:
+                    self.clock.tick()
+                else:
+                    self.clock.tick(self.fps)
+                self.profiler.lap('tick')
+        return GenerationResult(frames, time.perf_counter() - start, reason is not None, reason)
+
+    def survivors_identical(self):
+        """True when all living birds share one genome and one state (see scheduler)."""
+        alive = [bird for bird in self.population if bird.is_alive]
+        if len(alive) < 2:
+            return False
+        first = alive[0]
+        state = (first.y, first.velocity, first.flap_cooldown)
+        genome = flatten_genome(first.get_genome())
+        return all((bird.y, bird.velocity, bird.flap_cooldown) == state
+                   and np.array_equal(flatten_genome(bird.get_genome()), genome)
+                   for bird in alive[1:])
+
+    def step(self, render=False):
+        """Advance the object engine by one frame (and draw it when rendering)."""
+        profiler = self.profiler
+        profiler.start()
+
+        # Move base
+        self.base_x -= self.base_speed
+        if self.base_x <= -self.base_width:
+            self.base_x = 0
+
+        # Move pipes
+        for pipe in self.pipes:
+            pipe.move()
+        self.pipes.advance()
+        profiler.lap('pipes')
+
+        # Only the pipe level with the birds can hit them
+        pipe = self.pipes.collision_pipe()
+        if pipe is not None:
             for bird in self.population:
-                if bird.is_alive:
-                    # Find the closest pipe
-                    closest_pipe = None
-                    for pipe in self.pipes:
-                        if pipe.x + pipe.WIDTH > bird.x:
-                            closest_pipe = pipe
-                            break
-                    if closest_pipe:
-                        # Prepare AI inputs
-                        inputs = np.array([
-                            bird.y / self.screen_height,
-                            (closest_pipe.x - bird.x) / self.screen_width,
-                            closest_pipe.top_pipe_height / self.screen_height,
-                            closest_pipe.bottom_pipe_height / self.screen_height
-                        ])
-                        bird.decide(inputs)
-                    bird.update()
-
-                    # Check collision with ground or ceiling
-                    if (bird.rect.bottom > self.screen_height - self.base.get_height()
-                            or bird.rect.top < 0):
-                        bird.is_alive = False
-                        print(f"Bird at y: {bird.y} collided with ground or ceiling.")
-
-                    # Draw bird
-                    bird.draw(self.screen)
-
-            # Render stats
-            self.render_stats()
-
-            pygame.display.flip()
-            self.clock.tick(60)
+                if bird.is_alive and pipe.collide(bird):
+                    bird.is_alive = False
+                    profiler.count('collisions')
+                    logger.debug("Bird at y: %s collided with pipe.", bird.y)
+        profiler.lap('collide')
+
+        add_pipe = False
+        for pipe in self.pipes:
+            if not pipe.passed and pipe.x < self.screen_width // 2:
+                pipe.passed = True
+                add_pipe = True
+                # Increment score for each alive bird
+                for bird in self.population:
+                    if bird.is_alive:
+                        bird.score += 1
+                        logger.debug("Bird at y: %s passed a pipe. Score: %d", bird.y, bird.score)
+
+        if add_pipe:
+            logger.debug("Adding new pipe.")
+            self.gaps_passed += 1
+            if self.gaps_passed > Game.best_record:  # Update class-level best record
+                Game.best_record = self.gaps_passed
+            self.pipes.append(self.new_pipe())
+
+        if self.pipes.drop_off_screen():
+            logger.debug("Removed off-screen pipe.")
+        profiler.lap('score')
+
+        # Birds don't affect each other, so all of them decide before any moves
+        alive = [bird for bird in self.population if bird.is_alive]
+        closest_pipe = self.pipes.nearest_pipe()
+        if closest_pipe:
+            # The closest pipe is the same for every bird, so its inputs are built once
+            pipe_inputs = ((closest_pipe.x - self.bird_x) / self.screen_width,
+                           closest_pipe.top_pipe_height / self.screen_height,
+                           closest_pipe.bottom_pipe_height / self.screen_height)
+            # A bird on flap cooldown couldn't flap whatever its network said
+            ready = [bird for bird in alive if bird.flap_cooldown == 0]
+            for bird in ready:
+                # Prepare AI inputs
+                inputs = np.array([bird.y / self.screen_height, *pipe_inputs])
+                bird.decide(inputs)
+            profiler.count('forward_calls', len(ready))
+        profiler.lap('forward')
+
+        # Update birds
+        for bird in alive:
+            bird.update()
+
+            # Check collision with ground or ceiling
+            if (bird.rect.bottom > self.screen_height - self.base_height
+                    or bird.rect.top < 0):
+                bird.is_alive = False
+                profiler.count('collisions')
+                logger.debug("Bird at y: %s collided with ground or ceiling.", bird.y)
+        profiler.count('bird_steps', len(alive))
+        profiler.lap('update')
+
+        if render:
+            self.draw(alive)
+            profiler.lap('draw')
+
+    def draw(self, birds):
+        """Draw background, pipes, the given birds and the stats."""
+        self.draw_background()
+        for pipe in self.pipes:
+            pipe.draw(self.screen)
+        for bird in birds:
+            bird.draw(self.screen)
+        self.render_stats()
+
+    def run_vectorized(self, scheduler=None):
+        """Simulate the population headless with whole-array physics and collisions."""
+        if scheduler is None:
+            scheduler = EvaluationScheduler()
+        sample_bird = self.population[0]
+        sim = PopulationSimulator(len(self.population), bird_x=self.bird_x, bird_y=sample_bird.y,
+                                  pipe_gap=self.pipes.pipes[0].gap, courses=[self.course],
+                                  profiler=self.profiler,
+                                  **simulator_options(self.screen_width, self.screen_height))
+
+        brain = PopulationBrain.from_networks([bird.brain for bird in self.population])
+        genomes = None
+        if scheduler.stop_identical:
+            genomes = np.stack([flatten_genome(bird.get_genome()) for bird in self.population])
+        result = scheduler.run_simulator(sim, brain, genomes)
+
+        # Copy the final state back so the birds look like they played the round
+        for i, bird in enumerate(self.population):
+            bird.y = sim.y[i]
+            bird.velocity = sim.velocity[i]
+            bird.flap_cooldown = int(sim.flap_cooldown[i])
+            bird.is_alive = bool(sim.alive[i])
+            bird.score = int(sim.score[i])
+        self.gaps_passed = sim.gaps_passed
+        if self.gaps_passed > Game.best_record:
+            Game.best_record = self.gaps_passed
+        return result
 
     def render_stats(self):
         """Render generation and fitness statistics on the screen."""
-        
+        if self.font is None:
+            import pygame
+            self.font = pygame.font.SysFont('Arial', 24)
+
         gaps_passed_text = self.font.render(f"Gaps Passed: {self.gaps_passed}", True, (0, 0, 0))
         best_record_text = self.font.render(f"Best Record: {Game.best_record}", True, (0, 0, 0))  # Use class-level attribute
+        speed_text = self.font.render(f"Speed: {self.speed_label}", True, (0, 0, 0))
 
 
 
         
         self.screen.blit(gaps_passed_text, (10, 10))
         self.screen.blit(best_record_text,(10, 40))
+        self.screen.blit(speed_text, (10, 70))
 
 
         
@@ -1,31 +1,36 @@
 # genetic_algorithm.py
+import heapq
+import logging
 import numpy as np
 from bird import Bird
-import pickle
+from neural_network import GenomeMatrix, PARAMETER_SHAPES
+from profiling import NULL_PROFILER
+from utils import get_rng
+
+logger = logging.getLogger(__name__)
 
 def select_parents(population, num_parents):
     """
     Select the top-performing birds as parents based on their scores.
     """
-    # Sort the population based on scores in descending order
-    sorted_population = sorted(population, key=lambda bird: bird.score, reverse=True)
-    # Select the top 'num_parents' birds
-    parents = sorted_population[:num_parents]
-    return parents
+    # Same birds, in the same order, as a stable sort by descending score,
+    # without sorting the whole population
+    return heapq.nlargest(num_parents, population, key=lambda bird: bird.score)
 
-def create_next_generation(parents, population_size, elite_genome=None):
+def create_next_generation(parents, population_size, elite_genome=None, rng=None):
     """
     Create the next generation of birds.
     - Parents are used to breed new birds.
     - Optionally, an elite genome can be added to preserve the best bird.
     """
+    rng = get_rng(rng)
     next_generation = []
 
     # If elite_genome is provided, create an elite bird and add to next_generation
     if elite_genome is not None:
         elite_bird = Bird(x=100, y=350, genome=elite_genome)
         next_generation.append(elite_bird)
-        print("Elite bird added to the next generation.")
+        logger.debug("Elite bird added to the next generation.")
 
     # Calculate how many birds to create
     remaining_population = population_size - len(next_generation)
@@ -33,22 +38,24 @@ def create_next_generation(parents, population_size, elite_genome=None):
     # Breed new birds to fill the remaining population
     for _ in range(remaining_population):
         # Randomly select two parents
-        parent1, parent2 = np.random.choice(parents, 2, replace=False)
+        index1, index2 = rng.choice(len(parents), 2, replace=False)
+        parent1, parent2 = parents[index1], parents[index2]
         # Crossover their genomes
-        child_genome = crossover(parent1.get_genome(), parent2.get_genome())
+        child_genome = crossover(parent1.get_genome(), parent2.get_genome(), rng)
         # Mutate the child's genome
-        child_genome = mutate(child_genome, mutation_rate=0.1)
+        child_genome = mutate(child_genome, mutation_rate=0.1, rng=rng)
         # Create a new bird with the child's genome
         child_bird = Bird(x=100, y=350, genome=child_genome)
         next_generation.append(child_bird)
 
     return next_generation
 
-def crossover(genome1, genome2):
+def crossover(genome1, genome2, rng=None):
     """
     Perform crossover between two genomes to produce a child's genome.
     Assumes genome1 and genome2 are dictionaries with 'w1', 'b1', 'w2', 'b2' as keys.
     """
+    rng = get_rng(rng)
     child_genome = {}
     for key in genome1.keys():
         # Get the shape of the parameter
@@ -58,7 +65,7 @@ def crossover(genome1, genome2):
         flat2 = genome2[key].flatten()
         # Choose a random crossover point
         if len(flat1) > 1:
-            crossover_point = np.random.randint(1, len(flat1))
+            crossover_point = rng.integers(1, len(flat1))
         else:
             crossover_point = 0
         # Create child parameter by combining parent parameters
@@ -67,12 +74,86 @@ def crossover(genome1, genome2):
         child_genome[key] = child_flat.reshape(shape)
     return child_genome
 
-def mutate(genome, mutation_rate=0.1):
+def mutate(genome, mutation_rate=0.1, rng=None):
     """
     Mutate the genome by adding small random values to weights and biases.
     """
+    rng = get_rng(rng)
     for key in genome.keys():
-        mutation_mask = np.random.rand(*genome[key].shape) < mutation_rate
-        random_values = np.random.randn(*genome[key].shape) * mutation_mask
+        mutation_mask = rng.random(genome[key].shape) < mutation_rate
+        random_values = rng.standard_normal(genome[key].shape) * mutation_mask
         genome[key] += random_values
     return genome
+
+
+def birds_from_genomes(genomes):
+    """Build Bird objects from a GenomeMatrix (only needed to draw or for the object engine)."""
+    return [Bird(x=100, y=350, genome=genomes.genome(i)) for i in range(len(genomes))]
+
+def select_parent_indices(fitness, num_parents):
+    """
+    Row indices of the top-performing genomes, best first.
+    Ties keep population order, like select_parents.
+    """
+    fitness = np.asarray(fitness)
+    if 0 < num_parents < len(fitness):
+        # Only genomes at least as fit as the num_parents-th best can be picked,
+        # so the stable sort runs on those instead of the whole population
+        cutoff = np.partition(fitness, len(fitness) - num_parents)[len(fitness) - num_parents]
+        candidates = np.flatnonzero(fitness >= cutoff)
+        return candidates[np.argsort(-fitness[candidates], kind='stable')][:num_parents]
+    return np.argsort(-fitness, kind='stable')[:num_parents]
+
+def crossover_mask(num_children, rng=None):
+    """
+    (num_children, PARAMETER_COUNT) mask that is True where a child takes the
+    first parent's value: one single-point crossover per parameter, as in
+    crossover().
+    """
+    rng = get_rng(rng)
+    columns = []
+    for key, shape in PARAMETER_SHAPES:
+        size = int(np.prod(shape))
+        if size > 1:
+            points = rng.integers(1, size, size=num_children)
+        else:
+            points = np.zeros(num_children, dtype=int)
+        columns.append(np.arange(size) < points[:, None])
+    return np.concatenate(columns, axis=1)
+
+def crossover_rows(parents, num_children, rng=None):
+    """Breed num_children rows, each from two different random parent rows."""
+    rng = get_rng(rng)
+    first = rng.integers(0, len(parents), size=num_children)
+    second = rng.integers(0, len(parents) - 1, size=num_children)
+    second += second >= first
+    return np.where(crossover_mask(num_children, rng), parents[first], parents[second])
+
+def mutate_rows(children, mutation_rate=0.1, rng=None):
+    """Gaussian mutation of a random subset of parameters, in place."""
+    rng = get_rng(rng)
+    mutation_mask = rng.random(children.shape) < mutation_rate
+    children += rng.standard_normal(children.shape) * mutation_mask
+    return children
+
+def next_generation(genomes, fitness, num_parents, population_size, elite_genome=None,
+                    mutation_rate=0.1, rng=None, profiler=NULL_PROFILER):
+    """
+    Vectorized create_next_generation on a GenomeMatrix.
+    Parent selection, crossover and mutation for every child happen in a
+    handful of whole-matrix operations. elite_genome (a flat row) is kept
+    unchanged as row 0.
+    """
+    profiler.start()
+    parents = genomes.data[select_parent_indices(fitness, num_parents)]
+    profiler.lap('select')
+    num_children = population_size - (elite_genome is not None)
+    children = crossover_rows(parents, num_children, rng)
+    profiler.lap('crossover')
+    mutate_rows(children, mutation_rate, rng)
+    profiler.lap('mutate')
+
+    if elite_genome is not None:
+        children = np.concatenate([np.asarray(elite_genome, dtype=np.float64)[None, :], children])
+        logger.debug("Elite genome added to the next generation.")
+    return GenomeMatrix(children)
@@ -0,0 +1,239 @@
+# islands.py
+"""
+Island-model training: several populations evolve independently and
+periodically migrate their best genomes to the next island in a ring.
+
+    python islands.py --islands 4 --generations 200 --seed 0
+    python islands.py --serve 0.0.0.0:6000 --authkey secret     # on each node
+    python islands.py --hosts node1:6000 node2:6000 --authkey secret
+
+Local islands run in spawned processes connected by multiprocessing pipes;
+remote islands are reached over multiprocessing.connection sockets. Either
+way the coordinator only exchanges small headers and flat float64 genome
+buffers with them, and merges every island's best into a hall of fame whose
+top genome is written to best_genome.pkl (unless the genome there has a
+higher recorded fitness). Remote islands always need --authkey.
+"""
+import argparse
+import heapq
+import logging
+import multiprocessing
+import os
+import pickle
+from multiprocessing.connection import Client, Listener
+import numpy as np
+from assets import simulator_options
+from checkpoint import read_best_fitness, write_best
+from genetic_algorithm import next_generation, select_parent_indices
+from neural_network import PARAMETER_COUNT, GenomeMatrix, flatten_genome, unflatten_genome
+from parallel import evaluate_chunk
+from utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+def island_rng(seed, index):
+    """Independent, reproducible generator of one island."""
+    return np.random.default_rng(None if seed is None else [seed, index])
+
+def rows_from_bytes(buffer):
+    return np.frombuffer(buffer, dtype=np.float64).reshape(-1, PARAMETER_COUNT)
+
+def run_island(conn):
+    """
+    Island worker: wait for its options, then evolve one population and
+    trade migrants with the coordinator every `migration_interval`
+    generations. Used by local processes and by serve().
+    """
+    command, options = conn.recv()
+    if command != 'start':
+        raise ValueError(f"Unexpected island command: {command!r}")
+    index = options['index']
+    rng = island_rng(options['seed'], index)
+    size = options['population_size']
+    genomes = GenomeMatrix.random(size, rng)
+    if options.get('elite') is not None:
+        genomes.data[0] = options['elite']
+    sim_options = simulator_options()
+    num_parents = min(options['num_parents'], size)
+
+    generations = options['generations']
+    for generation in range(1, generations + 1):
+        course_seeds = [int(seed) for seed in rng.integers(0, 2**63 - 1, size=options['courses'])]
+        fitness, _ = evaluate_chunk(genomes.data, course_seeds, sim_options, limits=options['limits'])
+
+        immigrants = None
+        if generation % options['migration_interval'] == 0 or generation == generations:
+            top = select_parent_indices(fitness, options['migrants'])
+            conn.send(('migrants', index, generation, fitness[top].tolist(), float(fitness.mean())))
+            conn.send_bytes(genomes.data[top].tobytes())
+            if generation == generations:
+                break
+            immigrants = rows_from_bytes(conn.recv_bytes())
+
+        best_index = int(np.argmax(fitness))
+        genomes = next_generation(genomes, fitness, num_parents, size,
+                                  elite_genome=genomes.data[best_index], rng=rng)
+        if immigrants is not None and len(immigrants):
+            # Immigrants take the place of the last (random) children, never the elite
+            immigrants = immigrants[:size - 1]
+            genomes.data[-len(immigrants):] = immigrants
+    conn.close()
+
+def serve(address, authkey):
+    """
+    Host islands for remote coordinators, one connection at a time.
+    Peers are unpickled, so an authkey is required.
+    """
+    if not authkey:
+        raise ValueError("Serving islands needs an authkey.")
+    with Listener(address, authkey=authkey) as listener:
+        logger.info("Serving islands on %s:%d.", *listener.address)
+        while True:
+            with listener.accept() as conn:
+                logger.info("Island started for %s.", listener.last_accepted)
+                run_island(conn)
+
+class IslandCoordinator:
+    """
+    Start the islands (local processes and/or remote hosts), relay migrants
+    around the ring and keep a hall of fame of the best genomes seen.
+    """
+    def __init__(self, islands=4, hosts=(), authkey=None):
+        if hosts and not authkey:
+            raise ValueError("Remote islands need an authkey.")
+        self.connections = []
+        self.processes = []
+        context = multiprocessing.get_context('spawn')
+        for _ in range(islands):
+            parent, child = context.Pipe()
+            process = context.Process(target=run_island, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+        for host in hosts:
+            name, port = host.rsplit(':', 1)
+            self.connections.append(Client((name, int(port)), authkey=authkey))
+        if not self.connections:
+            raise ValueError("No islands: give a local island count or a host list.")
+        self.hall_of_fame = []  # min-heap of (fitness, generation, island, row bytes)
+        self.famous = set()     # row bytes in the hall of fame
+
+    def remember(self, fitness, generation, island, rows, size):
+        # An island's elite migrates again and again; it only gets in once
+        for score, row in zip(fitness, rows):
+            key = row.tobytes()
+            if key in self.famous:
+                continue
+            entry = (score, generation, island, key)
+            if len(self.hall_of_fame) < size:
+                heapq.heappush(self.hall_of_fame, entry)
+            elif entry > self.hall_of_fame[0]:
+                self.famous.discard(heapq.heapreplace(self.hall_of_fame, entry)[3])
+            else:
+                continue
+            self.famous.add(key)
+
+    def run(self, generations=100, population_size=50, num_parents=20, migration_interval=5, migrants=2,
+            courses=1, seed=None, limits=None, elite=None, hall_size=10):
+        """Evolve every island and return the hall of fame, best first."""
+        count = len(self.connections)
+        for index, conn in enumerate(self.connections):
+            conn.send(('start', dict(index=index, seed=seed, population_size=population_size,
+                                     num_parents=num_parents, generations=generations,
+                                     migration_interval=migration_interval, migrants=migrants,
+                                     courses=courses, limits=limits, elite=elite)))
+
+        epoch_generation = 0
+        while epoch_generation < generations:
+            outgoing = [None] * count
+            for conn in self.connections:
+                _, index, epoch_generation, fitness, mean = conn.recv()
+                rows = rows_from_bytes(conn.recv_bytes())
+                outgoing[index] = rows
+                self.remember(fitness, epoch_generation, index, rows, hall_size)
+                logger.debug("Island %d generation %d: best=%s mean=%.2f",
+                             index, epoch_generation, fitness[0], mean)
+            best = max(self.hall_of_fame)
+            logger.info("Generation %d: hall-of-fame best=%s (island %d, generation %d)",
+                        epoch_generation, best[0], best[2], best[1])
+            if epoch_generation < generations:
+                # Ring topology: island i receives the migrants of island i - 1
+                for index, conn in enumerate(self.connections):
+                    conn.send_bytes(outgoing[index - 1].tobytes())
+        return sorted(self.hall_of_fame, reverse=True)
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def save_best(hall_of_fame, path='best_genome.pkl'):
+    """
+    Write the hall of fame's best genome in best_genome.pkl format, unless
+    the genome already there has a higher recorded fitness.
+    """
+    fitness, generation, island, row = hall_of_fame[0]
+    stored = read_best_fitness(path)
+    if stored is not None and stored > fitness:
+        logger.info("Kept %s: its fitness %s beats this run's best %s.", path, stored, fitness)
+        return
+    write_best(path, unflatten_genome(np.frombuffer(row, dtype=np.float64).copy()), fitness)
+    logger.info("Saved best genome (fitness %s, island %d, generation %d) to %s.",
+                fitness, island, generation, path)
+
+def main(islands=4, hosts=(), authkey='', generations=100, population_size=50, migration_interval=5,
+         migrants=2, courses=1, seed=None, max_frames=None, max_score=None, output='best_genome.pkl'):
+    elite = None
+    if os.path.exists(output):
+        with open(output, 'rb') as f:
+            elite = flatten_genome(pickle.load(f))
+        logger.info("Seeding every island with the genome in %s.", output)
+    limits = dict(max_frames=max_frames, max_score=max_score)
+    with IslandCoordinator(islands, hosts, authkey.encode() or None) as coordinator:
+        hall_of_fame = coordinator.run(generations, population_size, migration_interval=migration_interval,
+                                       migrants=migrants, courses=courses, seed=seed, limits=limits,
+                                       elite=elite)
+    save_best(hall_of_fame, output)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Island-model genetic algorithm.")
+    parser.add_argument('--islands', type=int, default=4, help="Local island processes.")
+    parser.add_argument('--hosts', nargs='*', default=[], metavar='HOST:PORT',
+                        help="Remote island servers (started with --serve), one island each.")
+    parser.add_argument('--authkey', default='',
+                        help="Shared secret for remote islands (required with --serve and --hosts).")
+    parser.add_argument('--serve', default=None, metavar='HOST:PORT',
+                        help="Run as an island server for a remote coordinator.")
+    parser.add_argument('--generations', type=int, default=100)
+    parser.add_argument('--population-size', type=int, default=50, help="Genomes per island.")
+    parser.add_argument('--migration-interval', type=int, default=5)
+    parser.add_argument('--migrants', type=int, default=2, help="Genomes each island sends per migration.")
+    parser.add_argument('--courses', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--max-score', type=int, default=None)
+    parser.add_argument('--output', default='best_genome.pkl')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args(argv)
+    # Islands exchange pickles, so an unauthenticated socket would run whatever a peer sends
+    if (args.serve is not None or args.hosts) and not args.authkey:
+        parser.error("--serve and --hosts need --authkey")
+    return args
+
+if __name__ == "__main__":
+    options = vars(parse_args())
+    configure_logging(options.pop('log_level'))
+    address = options.pop('serve')
+    if address is not None:
+        host, port = address.rsplit(':', 1)
+        serve((host, int(port)), options['authkey'].encode() or None)
+    else:
+        main(**options)
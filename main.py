@@ -1,84 +1,327 @@
 # main.py
-import pygame
-from bird import Bird
-from genetic_algorithm import select_parents, create_next_generation
-from game import Game
+import logging
+from genetic_algorithm import birds_from_genomes
+from game import Game, simulator_options
+from neural_network import GenomeMatrix, flatten_genome
+from parallel import ParallelEvaluator, evaluate_chunk
+from checkpoint import CheckpointWriter, GenomeArchive, read_best_fitness
+from scheduler import EvaluationScheduler, GenerationResult
+from fitness_cache import FitnessCache, cacheable
+from profiling import NULL_PROFILER, Profiler
+from optimizers import OPTIMIZERS
 import pickle  # For saving and loading the best genome
 import os  # For checking file existence
+import argparse
+import numpy as np
+from utils import configure_logging
 
-def main():
-    # Initialize Pygame
-    pygame.init()
-    print("Pygame initialized.")
+logger = logging.getLogger(__name__)
+
+def main(headless=False, render_every=1, generations=1000, population_size=50, engine='objects',
+         workers=0, courses=1, seed=None, fixed_courses=False, max_frames=None, max_score=None,
+         max_seconds=None, stop_identical=False, adaptive_cap=False, checkpoint_dir=None, resume=None,
+         renderer='dirty', max_drawn_birds=50, fitness_cache=100000, fitness_cache_file=None,
+         profile_jsonl=None, profile_prometheus=None, profile_generation=None, profile_output='generation.prof',
+         optimizer='ga', es_sigma=None, es_learning_rate=None, es_adaptive=False, steps_per_frame=1,
+         uncapped=False):
+    """
+    Train the population.
+    - headless=True never opens a window and runs every generation uncapped.
+    - Otherwise only every `render_every`-th generation is drawn at 60 FPS,
+      running `steps_per_frame` simulation steps per drawn frame (uncapped:
+      as many as fit between frames); Up/Down, U and 1 change the speed
+      while it runs. The generations in between run headless at full speed.
+    - engine='vectorized' runs the headless generations on NumPy arrays.
+    - workers > 0 evaluates headless generations on a process pool instead,
+      each genome playing `courses` seeded courses (the vectorized engine
+      batches the courses in-process too).
+    - seed makes the whole run reproducible: one np.random.Generator drives
+      the initial population, every generation's pipe course(s) and the GA.
+    - fixed_courses=True replays the same course(s) every generation, which
+      makes fitness far less noisy.
+    - max_frames / max_score / max_seconds cap every generation, and
+      stop_identical ends one early once the survivors are clones, so a
+      population that flies forever can't stall training. adaptive_cap
+      raises the frame and score caps whenever a generation reaches them.
+    - checkpoint_dir archives every evaluated generation (see GenomeArchive);
+      resume='latest' or a generation number continues training from it,
+      running `generations` more generations.
+    - renderer='dirty' redraws only what changed each frame and draws at most
+      `max_drawn_birds` birds (an even sample of the living ones); 'full'
+      redraws the whole window.
+    - fitness_cache keeps the scores of up to that many (genome, course)
+      pairs so known genomes aren't simulated again (0 disables it);
+      fitness_cache_file persists them across runs.
+    - profile_jsonl / profile_prometheus export per-phase timings and
+      counters every generation; profile_generation captures that generation
+      with cProfile into profile_output.
+    - optimizer='ga' breeds each generation with the genetic algorithm;
+      'es' runs evolution strategies instead (see optimizers.EvolutionStrategy)
+      with step size es_sigma, es_learning_rate and, with es_adaptive, a
+      self-adapting step size (None keeps EvolutionStrategy's defaults;
+      the es_* options are an error with any other optimizer).
+    """
+    # Called from Python rather than the command line: still log the generation summaries
+    if not logging.getLogger().handlers:
+        configure_logging()
 
     # Set up display
     screen_width = 500
     screen_height = 700
-    screen = pygame.display.set_mode((screen_width, screen_height))
-    pygame.display.set_caption("Flappy Bird AI")
-    print("Pygame display set.")
+    if headless:
+        screen = None
+        logger.info("Running headless.")
+    else:
+        # pygame is only needed to draw; headless runs and the worker
+        # processes (which re-import this module) never load it
+        import pygame
+        pygame.init()
+        logger.info("Pygame initialized.")
+
+        screen = pygame.display.set_mode((screen_width, screen_height))
+        pygame.display.set_caption("Flappy Bird AI")
+        logger.info("Pygame display set.")
 
     # Initialize population
-    population_size = 50
     best_genome = None
+    best_so_far = None  # Fitness best_genome.pkl has to beat to be overwritten
 
     # Check if a saved best genome file exists
     if os.path.exists('best_genome.pkl'):
         with open('best_genome.pkl', 'rb') as f:
             best_genome = pickle.load(f)
-        print("Loaded best genome from file.")
+        best_so_far = read_best_fitness('best_genome.pkl')
+        logger.info("Loaded best genome from file.")
 
-    # Create initial population
-    if best_genome:
-        # Start with one elite bird (best bird from previous session) and the rest random
-        population = [Bird(x=100, y=350, genome=best_genome)] + [Bird(x=100, y=350) for _ in range(population_size - 1)]
-    else:
-        # If no saved genome, start with a fully random population
-        population = [Bird(x=100, y=350) for _ in range(population_size)]
+    rng = np.random.default_rng(seed)
+    if optimizer not in OPTIMIZERS:
+        raise ValueError(f"Unknown optimizer: {optimizer!r}")
+    # Options left as None keep the optimizer's defaults
+    optimizer_options = dict(ga=dict(num_parents=20),  # 20 parents each generation
+                             es=dict(sigma=es_sigma, learning_rate=es_learning_rate, adaptive=es_adaptive or None))
+    if optimizer != 'es' and any(value is not None for value in optimizer_options['es'].values()):
+        raise ValueError("es_sigma, es_learning_rate and es_adaptive need optimizer='es'.")
+    options = {name: value for name, value in optimizer_options[optimizer].items() if value is not None}
+    breeder = OPTIMIZERS[optimizer](population_size, **options)
+
+    # Create initial population: one flat genome per row, starting from the
+    # best genome of the previous session if there is one
+    genomes = breeder.initial_population(rng, flatten_genome(best_genome) if best_genome else None)
+
+    logger.info("Initialized population of %d birds.", population_size)
+
+    # Create Game instance with the screen; Birds are only built for generations it plays
+    frame_renderer = None
+    if screen is not None and renderer == 'dirty':
+        from renderer import DirtyRectRenderer
+        frame_renderer = DirtyRectRenderer(screen, max_drawn_birds)
+    profiler = NULL_PROFILER
+    if profile_jsonl or profile_prometheus or profile_generation is not None:
+        profiler = Profiler(profile_jsonl, profile_prometheus, profile_generation, profile_output)
+    game = Game([], screen, screen_width, screen_height, engine=engine, rng=rng, renderer=frame_renderer,
+                profiler=profiler, steps_per_frame=steps_per_frame, uncapped=uncapped)
+
+    archive = GenomeArchive(checkpoint_dir) if checkpoint_dir else None
+    first_generation = 0
+    course_seeds = None
+    if resume is not None:
+        if archive is None:
+            raise ValueError("Resuming needs a checkpoint directory.")
+        # Breed the generation after the archived one exactly as the original run would have
+        previous, fitness, record = archive.load(None if resume == 'latest' else int(resume))
+        if record['rng_state'] is not None:
+            rng.bit_generator.state = record['rng_state']
+        if fixed_courses and record['course_seeds']:
+            course_seeds = record['course_seeds']
+        first_generation = record['generation']
+        archived_best = max(r['best_fitness'] for r in archive.records if r['generation'] <= first_generation)
+        best_so_far = archived_best if best_so_far is None else max(best_so_far, archived_best)
+        breeder.resume(previous)
+        genomes = breeder.next_population(previous, fitness.tolist(), rng)
+        logger.info("Resumed from generation %d of %s.", first_generation, checkpoint_dir)
+
+    sim_options = simulator_options(screen_width, screen_height)
+    scheduler = EvaluationScheduler(max_frames, max_score, max_seconds, stop_identical, adaptive_cap)
+    evaluator = None
+    if workers > 0:
+        evaluator = ParallelEvaluator(workers, courses, sim_options=sim_options, scheduler=scheduler)
+        logger.info("Evaluating on %d worker processes.", workers)
 
-    print(f"Initialized population of {population_size} birds.")
+    cache = FitnessCache(fitness_cache, fitness_cache_file, sim_options) if fitness_cache > 0 else None
 
-    # Create Game instance with the screen and population
-    game = Game(population, screen)
+    # Checkpoints and the best genome are written off the training loop
+    writer = CheckpointWriter(archive)
 
-    # Run generations
-    generations = 1000
-    num_parents = 20  # Number of parents to select each generation
+    try:
+        # Run generations
+        for generation in range(first_generation, first_generation + generations):
+            logger.debug("--- Generation %d ---", generation + 1)
+            profiler.begin_generation(generation + 1)
 
-    for generation in range(generations):
-        print(f"\n--- Generation {generation + 1} ---")
+            # Run the game for the current population on this generation's course(s)
+            if course_seeds is None or not fixed_courses:
+                course_seeds = [int(course) for course in rng.integers(0, 2**63 - 1, size=courses)]
+            render = screen is not None and generation % render_every == 0
+            in_game = render or (evaluator is None and engine == 'objects')
+            # The object engine plays only the first course
+            played = course_seeds[:1] if in_game else course_seeds
 
-        # Run the game for the current population
-        game.run_generation()
+            # Known genomes take their score from the cache; a drawn generation flies everyone
+            fitness_scores = [None] * len(genomes)
+            if cache is not None:
+                keys = cache.keys(genomes.data, played, (scheduler.max_frames, scheduler.max_score))
+                if not render:
+                    fitness_scores = cache.lookup(keys)
+            missing = [i for i, fitness in enumerate(fitness_scores) if fitness is None]
+            rows = genomes.data[missing]
+            partial = len(missing) < len(genomes)
+            profiler.stage('cache')
 
-        # Get fitness scores
-        fitness_scores = game.get_fitness_scores()
-        print(f"Fitness scores: {fitness_scores}")
+            if not missing:
+                scores, result = [], GenerationResult(0, 0.0, False, None)
+            elif in_game:
+                game.reset(birds_from_genomes(GenomeMatrix(rows)), seed=played[0])
+                result = game.run_generation(render=render, scheduler=EvaluationScheduler(
+                    **scheduler.limits(partial)) if partial else scheduler)
 
-        # Identify the best bird
-        best_fitness = max(fitness_scores)
-        best_index = fitness_scores.index(best_fitness)
-        best_bird = population[best_index]
-        print(f"Best bird in Generation {generation + 1}: Score = {best_fitness}")
+                # Get fitness scores
+                scores = game.get_fitness_scores()
+            elif evaluator is not None:
+                scores = evaluator.evaluate(rows, course_seeds)
+                result = evaluator.last_result
+            else:
+                scores, result = evaluate_chunk(rows, course_seeds, sim_options, limits=scheduler.limits(partial),
+                                                profiler=profiler)
+                scores = scores.tolist()
+            for i, fitness in zip(missing, scores):
+                fitness_scores[i] = fitness
+            profiler.stage('evaluate')
 
-        # Save the best genome if it's better than the previous best
-        best_genome = best_bird.get_genome()
-        with open('best_genome.pkl', 'wb') as f:
-            pickle.dump(best_genome, f)
-        print("Best genome saved.")
+            if cache is not None:
+                if cacheable(result):
+                    cache.store([keys[i] for i in missing], scores)
+                    cache.flush()
+                hits, misses = cache.generation_stats()
+                logger.info("Fitness cache: %d hits, %d misses.", hits, misses)
+                profiler.stage('cache')
+            logger.debug("Fitness scores: %s", fitness_scores)
 
-        # Select parents based on fitness
-        parents = select_parents(population, num_parents)
-        print(f"Selected top {num_parents} parents.")
+            # Identify the best bird
+            best_fitness = max(fitness_scores)
+            best_index = fitness_scores.index(best_fitness)
+            # Headless, parallel and cached generations count towards the drawn record too
+            # (a mean over several courses is rounded down: some course got at least that far)
+            Game.best_record = max(Game.best_record, int(best_fitness))
+            logger.info("Generation %d: best=%s mean=%.2f",
+                        generation + 1, best_fitness, sum(fitness_scores) / len(fitness_scores))
+            if result.truncated:
+                logger.info("Generation %d truncated after %d frames (%.1fs): %s.",
+                            generation + 1, result.frames, result.seconds, result.reason)
+            scheduler.record(result)
 
-        # Create next generation with elitism
-        population = create_next_generation(parents, population_size, elite_genome=best_genome)
-        print(f"Created new generation of {population_size} birds.")
+            # Archive the generation and save the best genome whenever it improves
+            writer.append(generation + 1, genomes.data, fitness_scores, course_seeds, rng.bit_generator.state)
+            if best_so_far is None or best_fitness > best_so_far:
+                best_so_far = best_fitness
+                writer.save_best('best_genome.pkl', genomes.genome(best_index), best_fitness)
+            profiler.stage('checkpoint')
 
-        # Reset the game with the new population
-        game.reset(population)
+            # Breed (GA) or sample (ES) the whole next generation at once
+            genomes = breeder.next_population(genomes, fitness_scores, rng, profiler=profiler)
+            profiler.stage('breed')
+            logger.debug("Created new generation of %d birds.", population_size)
+            profiler.end_generation()
+    finally:
+        # Also on errors, so queued checkpoints reach the disk and workers exit
+        if evaluator is not None:
+            evaluator.close()
+        if cache is not None:
+            cache.close()
+        writer.close()
+    logger.info("Training completed.")
 
-    print("\nTraining completed.")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train a Flappy Bird AI with a genetic algorithm.")
+    parser.add_argument('--headless', action='store_true',
+                        help="Run without a window, drawing or frame cap.")
+    parser.add_argument('--render-every', type=int, default=1,
+                        help="Draw every N-th generation; the rest run headless.")
+    parser.add_argument('--generations', type=int, default=1000)
+    parser.add_argument('--population-size', type=int, default=50)
+    parser.add_argument('--steps-per-frame', type=int, default=1,
+                        help="Simulation steps per drawn frame (Up/Down change it while running).")
+    parser.add_argument('--uncapped', action='store_true',
+                        help="Simulate flat out, drawing a frame only every 1/60 s (U toggles it).")
+    parser.add_argument('--renderer', choices=['dirty', 'full'], default='dirty',
+                        help="'dirty' redraws only changed rectangles; 'full' redraws the whole window.")
+    parser.add_argument('--max-drawn-birds', type=int, default=50,
+                        help="Draw at most N birds, an even sample of the living ones, with the dirty renderer.")
+    parser.add_argument('--engine', choices=['objects', 'vectorized'], default='objects',
+                        help="Simulation used for headless generations.")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Evaluate headless generations on N processes (0 = in-process).")
+    parser.add_argument('--courses', type=int, default=1,
+                        help="Seeded pipe courses per genome (vectorized engine or --workers).")
+    parser.add_argument('--fixed-courses', action='store_true',
+                        help="Replay the same course(s) every generation.")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed for a reproducible run (population, courses and GA).")
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help="Stop a generation after N frames.")
+    parser.add_argument('--max-score', type=int, default=None,
+                        help="Stop a generation once the survivors have passed N pipes.")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Wall-clock budget per generation (per chunk with --workers).")
+    parser.add_argument('--stop-identical', action='store_true',
+                        help="Stop a generation early once every survivor has the same genome.")
+    parser.add_argument('--adaptive-cap', action='store_true',
+                        help="Raise --max-frames/--max-score each time a generation reaches them.")
+    parser.add_argument('--checkpoint-dir', default=None,
+                        help="Archive every generation's genomes and fitness in this directory.")
+    parser.add_argument('--resume', nargs='?', const='latest', default=None,
+                        help="Continue from the latest (or the given) archived generation.")
+    parser.add_argument('--optimizer', choices=sorted(OPTIMIZERS), default='ga',
+                        help="'ga' = genetic algorithm, 'es' = evolution strategies.")
+    parser.add_argument('--es-sigma', type=float, default=None,
+                        help="Standard deviation of the ES perturbations (default 1.0).")
+    parser.add_argument('--es-learning-rate', type=float, default=None,
+                        help="Fraction of the rank-weighted mean perturbation the ES center moves by (default 1.0).")
+    parser.add_argument('--es-adaptive', action='store_true',
+                        help="Adapt the ES step size (cumulative step-size adaptation).")
+    parser.add_argument('--fitness-cache', type=int, default=100000,
+                        help="Remember the scores of up to N (genome, course) pairs (0 disables).")
+    parser.add_argument('--fitness-cache-file', default=None,
+                        help="Keep the fitness cache in this file across runs.")
+    parser.add_argument('--profile-jsonl', default=None,
+                        help="Append each generation's stage and phase timings and counters to this JSON-lines file.")
+    parser.add_argument('--profile-prometheus', default=None,
+                        help="Keep cumulative timings and counters in this Prometheus text file.")
+    parser.add_argument('--profile-generation', type=int, default=None,
+                        help="Capture this generation with cProfile.")
+    parser.add_argument('--profile-output', default='generation.prof',
+                        help="Where --profile-generation writes its pstats file.")
+    parser.add_argument('--log-level', default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="DEBUG logs per-frame events; INFO only per-generation summaries.")
+    parser.add_argument('--log-sample', type=int, default=1,
+                        help="Keep only every N-th DEBUG message from each call site.")
+    args = parser.parse_args(argv)
+    if args.render_every < 1:
+        parser.error("--render-every must be at least 1")
+    if args.steps_per_frame < 1:
+        parser.error("--steps-per-frame must be at least 1")
+    if args.adaptive_cap and args.max_frames is None and args.max_score is None:
+        parser.error("--adaptive-cap needs --max-frames or --max-score")
+    if args.optimizer != 'es' and (args.es_sigma is not None or args.es_learning_rate is not None
+                                   or args.es_adaptive):
+        parser.error("--es-sigma, --es-learning-rate and --es-adaptive need --optimizer es")
+    if args.optimizer == 'es' and args.population_size < 2:
+        parser.error("--optimizer es needs a population of at least 2")
+    if args.resume is not None and args.checkpoint_dir is None:
+        parser.error("--resume needs --checkpoint-dir")
+    return args
 
 if __name__ == "__main__":
-    main()
+    options = vars(parse_args())
+    configure_logging(options.pop('log_level'), options.pop('log_sample'))
+    main(**options)
@@ -1,8 +1,80 @@
 # neural_network.py
 import numpy as np
+from utils import get_rng
+
+# Order and shape of the parameters when a genome is stored as one flat vector
+PARAMETER_SHAPES = (('w1', (4, 5)), ('b1', (5,)), ('w2', (5, 1)), ('b2', (1,)))
+PARAMETER_COUNT = sum(int(np.prod(shape)) for _, shape in PARAMETER_SHAPES)
+
+def parameter_slices():
+    """Column range of each parameter inside a flat genome."""
+    slices = {}
+    start = 0
+    for key, shape in PARAMETER_SHAPES:
+        size = int(np.prod(shape))
+        slices[key] = slice(start, start + size)
+        start += size
+    return slices
+
+def flatten_genome(genome):
+    """Pack a {'w1', 'b1', 'w2', 'b2'} genome into one float64 vector."""
+    return np.concatenate([np.ravel(genome[key]) for key, _ in PARAMETER_SHAPES]).astype(np.float64)
+
+def unflatten_genome(flat):
+    """Inverse of flatten_genome. The returned arrays are views into `flat`."""
+    slices = parameter_slices()
+    return {key: flat[slices[key]].reshape(shape) for key, shape in PARAMETER_SHAPES}
+
+class GenomeMatrix:
+    """
+    A whole population of genomes as rows of one contiguous
+    (population, PARAMETER_COUNT) float64 matrix.
+    w1/b1/w2/b2 are (population, ...) views into the same memory.
+    """
+    def __init__(self, data):
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        if self.data.ndim != 2 or self.data.shape[1] != PARAMETER_COUNT:
+            raise ValueError(f"Expected an (N, {PARAMETER_COUNT}) matrix, got {self.data.shape}")
+
+    @classmethod
+    def random(cls, size, rng=None):
+        """Standard-normal parameters, like a fresh NeuralNetwork."""
+        return cls(get_rng(rng).standard_normal((size, PARAMETER_COUNT)))
+
+    @classmethod
+    def from_genomes(cls, genomes):
+        return cls(np.stack([flatten_genome(genome) for genome in genomes]))
+
+    def __len__(self):
+        return len(self.data)
+
+    def view(self, key):
+        """(population,) + shape view of one named parameter."""
+        shape = dict(PARAMETER_SHAPES)[key]
+        return self.data[:, parameter_slices()[key]].reshape((len(self.data),) + shape)
+
+    @property
+    def w1(self):
+        return self.view('w1')
+
+    @property
+    def b1(self):
+        return self.view('b1')
+
+    @property
+    def w2(self):
+        return self.view('w2')
+
+    @property
+    def b2(self):
+        return self.view('b2')
+
+    def genome(self, index):
+        """A copy of one row as a {'w1', 'b1', 'w2', 'b2'} dict."""
+        return unflatten_genome(self.data[index].copy())
 
 class NeuralNetwork:
-    def __init__(self, w1=None, b1=None, w2=None, b2=None):
+    def __init__(self, w1=None, b1=None, w2=None, b2=None, rng=None):
         # Define network architecture
         self.input_size = 4
         self.hidden_size = 5
@@ -15,10 +87,11 @@ class NeuralNetwork:
             self.w2 = w2
             self.b2 = b2
         else:
-            self.w1 = np.random.randn(self.input_size, self.hidden_size)
-            self.b1 = np.random.randn(self.hidden_size)
-            self.w2 = np.random.randn(self.hidden_size, self.output_size)
-            self.b2 = np.random.randn(self.output_size)
+            rng = get_rng(rng)
+            self.w1 = rng.standard_normal((self.input_size, self.hidden_size))
+            self.b1 = rng.standard_normal(self.hidden_size)
+            self.w2 = rng.standard_normal((self.hidden_size, self.output_size))
+            self.b2 = rng.standard_normal(self.output_size)
 
     def forward(self, inputs):
         hidden = np.tanh(np.dot(inputs, self.w1) + self.b1)
@@ -33,15 +106,76 @@ class NeuralNetwork:
             'b2': self.b2.copy()
         }
 
-    def mutate(self, mutation_rate=0.1):
-        mutation_mask_w1 = np.random.rand(*self.w1.shape) < mutation_rate
-        self.w1 += np.random.randn(*self.w1.shape) * mutation_mask_w1
+    def mutate(self, mutation_rate=0.1, rng=None):
+        rng = get_rng(rng)
+        mutation_mask_w1 = rng.random(self.w1.shape) < mutation_rate
+        self.w1 += rng.standard_normal(self.w1.shape) * mutation_mask_w1
+
+        mutation_mask_b1 = rng.random(self.b1.shape) < mutation_rate
+        self.b1 += rng.standard_normal(self.b1.shape) * mutation_mask_b1
+
+        mutation_mask_w2 = rng.random(self.w2.shape) < mutation_rate
+        self.w2 += rng.standard_normal(self.w2.shape) * mutation_mask_w2
+
+        mutation_mask_b2 = rng.random(self.b2.shape) < mutation_rate
+        self.b2 += rng.standard_normal(self.b2.shape) * mutation_mask_b2
+
+
+class PopulationBrain:
+    """
+    Every genome's parameters stacked into 3-D tensors so the whole population
+    is evaluated with one batched matmul per layer instead of one
+    NeuralNetwork.forward call per bird.
+    """
+    def __init__(self, genomes, dtype=np.float64):
+        self.set_parameters(np.stack([g['w1'] for g in genomes]), np.stack([g['b1'] for g in genomes]),
+                            np.stack([g['w2'] for g in genomes]), np.stack([g['b2'] for g in genomes]),
+                            dtype)
+
+    def set_parameters(self, w1, b1, w2, b2, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.w1 = np.asarray(w1, dtype=self.dtype)                  # (N, 4, 5)
+        self.b1 = np.asarray(b1, dtype=self.dtype)[:, None, :]      # (N, 1, 5)
+        self.w2 = np.asarray(w2, dtype=self.dtype)                  # (N, 5, 1)
+        self.b2 = np.asarray(b2, dtype=self.dtype)[:, None, :]      # (N, 1, 1)
+        self.size = len(self.w1)
+        self.all_indices = np.arange(self.size)
+
+    def selects_all(self, indices):
+        """True when `indices` is every genome in order, so no gather is needed."""
+        return len(indices) == self.size and np.array_equal(indices, self.all_indices)
+
+    @classmethod
+    def from_networks(cls, networks, dtype=np.float64):
+        return cls([{'w1': n.w1, 'b1': n.b1, 'w2': n.w2, 'b2': n.b2} for n in networks], dtype)
+
+    @classmethod
+    def from_flat(cls, genomes, dtype=np.float64):
+        """Build from an (N, PARAMETER_COUNT) matrix of flat genomes."""
+        genomes = np.asarray(genomes)
+        slices = parameter_slices()
+        brain = cls.__new__(cls)
+        brain.set_parameters(*(genomes[:, slices[key]].reshape((len(genomes),) + shape)
+                               for key, shape in PARAMETER_SHAPES), dtype=dtype)
+        return brain
 
-        mutation_mask_b1 = np.random.rand(*self.b1.shape) < mutation_rate
-        self.b1 += np.random.randn(*self.b1.shape) * mutation_mask_b1
+    def forward(self, inputs, indices=None):
+        """
+        Evaluate an (n, 4) input matrix, one row per bird.
+        `indices` selects which genomes the rows belong to (all of them if None).
+        Returns the (n,) network outputs.
+        """
+        w1, b1, w2, b2 = self.w1, self.b1, self.w2, self.b2
+        if indices is not None and not self.selects_all(indices):
+            w1, b1, w2, b2 = w1[indices], b1[indices], w2[indices], b2[indices]
+        x = np.asarray(inputs, dtype=self.dtype)[:, None, :]     # (n, 1, 4)
+        hidden = np.tanh(np.matmul(x, w1) + b1)                  # (n, 1, 5)
+        output = np.tanh(np.matmul(hidden, w2) + b2)             # (n, 1, 1)
+        return output[:, 0, 0]
 
-        mutation_mask_w2 = np.random.rand(*self.w2.shape) < mutation_rate
-        self.w2 += np.random.randn(*self.w2.shape) * mutation_mask_w2
+    def decide(self, inputs, indices=None):
+        """Flap mask: True where the network output is above 0.5, like Bird.decide."""
+        return self.forward(inputs, indices) > 0.5
 
-        mutation_mask_b2 = np.random.rand(*self.b2.shape) < mutation_rate
-        self.b2 += np.random.randn(*self.b2.shape) * mutation_mask_b2
+    # A PopulationBrain can be passed straight to PopulationSimulator as its policy
+    __call__ = decide
@@ -0,0 +1,164 @@
+# optimizers.py
+"""
+Optimizers that turn one evaluated generation into the next.
+
+Every optimizer works on flat genome rows (see GenomeMatrix) and has the
+same two methods, so the training loop doesn't care which one it drives:
+
+    genomes = optimizer.initial_population(rng, seed_genome)
+    ...evaluate genomes...
+    genomes = optimizer.next_population(genomes, fitness, rng)
+
+- 'ga': the genetic algorithm (truncation selection, crossover, mutation).
+- 'es': evolution strategies on the mean of a Gaussian search distribution.
+"""
+import logging
+import math
+import numpy as np
+from genetic_algorithm import next_generation
+from neural_network import PARAMETER_COUNT, GenomeMatrix
+from profiling import NULL_PROFILER
+
+logger = logging.getLogger(__name__)
+
+def centered_ranks(fitness):
+    """
+    Rank-based fitness shaping: the ranks of `fitness` scaled to [-0.5, 0.5].
+    Tied scores share their mean rank, so birds that died on the same frame
+    pull the search neither way.
+    """
+    fitness = np.asarray(fitness, dtype=np.float64)
+    if len(fitness) < 2:
+        return np.zeros(len(fitness))
+    ranks = np.empty(len(fitness))
+    ranks[np.argsort(fitness, kind='stable')] = np.arange(len(fitness))
+    _, tie, counts = np.unique(fitness, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(tie, ranks) / counts)[tie]
+    return ranks / (len(fitness) - 1) - 0.5
+
+class GeneticOptimizer:
+    """
+    The genetic algorithm of genetic_algorithm.next_generation: the top
+    `num_parents` genomes breed the next generation and the best genome is
+    kept unchanged as row 0.
+    """
+    def __init__(self, population_size, num_parents=20, mutation_rate=0.1):
+        self.population_size = population_size
+        self.num_parents = num_parents
+        self.mutation_rate = mutation_rate
+
+    def initial_population(self, rng, seed_genome=None):
+        """Standard-normal genomes; seed_genome (a flat row) replaces row 0."""
+        genomes = GenomeMatrix.random(self.population_size, rng)
+        if seed_genome is not None:
+            genomes.data[0] = seed_genome
+        return genomes
+
+    def resume(self, genomes):
+        """Nothing to restore: the GA keeps no state between generations."""
+
+    def next_population(self, genomes, fitness, rng, profiler=NULL_PROFILER):
+        best_index = int(np.argmax(fitness))
+        return next_generation(genomes, fitness, self.num_parents, self.population_size,
+                               elite_genome=genomes.data[best_index], mutation_rate=self.mutation_rate,
+                               rng=rng, profiler=profiler)
+
+class EvolutionStrategy:
+    """
+    Evolution strategies with antithetic sampling.
+    Each generation is `center ± sigma * eps` for population_size // 2 draws
+    of eps (plus the center itself as row 0 when the size is odd), so the
+    rows always average to the center. The center then moves by
+    `learning_rate` times the mean of the perturbations weighted by the
+    centered ranks of their scores (see centered_ranks). sigma=1 starts with
+    the spread of the GA's standard-normal population.
+    - adaptive=True adapts sigma by cumulative step-size adaptation, as in
+      CMA-ES: sigma grows while successive steps point the same way and
+      shrinks while they cancel out.
+    """
+    def __init__(self, population_size, sigma=1.0, learning_rate=1.0, adaptive=False,
+                 min_sigma=1e-3, max_sigma=10.0):
+        if population_size < 2:
+            raise ValueError("Evolution strategies need a population of at least 2.")
+        self.population_size = population_size
+        self.pairs = population_size // 2
+        self.sigma = sigma
+        self.learning_rate = learning_rate
+        self.adaptive = adaptive
+        self.min_sigma = min_sigma
+        self.max_sigma = max_sigma
+        self.center = None
+        self.path = np.zeros(PARAMETER_COUNT)
+
+    def initial_population(self, rng, seed_genome=None):
+        """Samples around seed_genome (a flat row), or around a standard-normal center."""
+        if seed_genome is None:
+            seed_genome = rng.standard_normal(PARAMETER_COUNT)
+        self.center = np.array(seed_genome, dtype=np.float64)
+        return self.sample(rng)
+
+    def sample(self, rng):
+        eps = rng.standard_normal((self.pairs, PARAMETER_COUNT))
+        rows = [self.center[None, :]] if self.population_size % 2 else []
+        rows += [self.center + self.sigma * eps, self.center - self.sigma * eps]
+        return GenomeMatrix(np.concatenate(rows))
+
+    def split(self, data):
+        """(center, plus, minus) rows of a generation laid out by sample()."""
+        offset = len(data) - 2 * self.pairs
+        return (data.mean(axis=0), data[offset:offset + self.pairs], data[offset + self.pairs:])
+
+    def resume(self, genomes):
+        """
+        Continue from an archived generation. The center is its mean; an
+        adaptive sigma is re-estimated from the spread of its antithetic pairs.
+        The evolution path of adaptive=True isn't archived, so it restarts
+        from zero and sigma adapts differently for the first generations
+        than in an uninterrupted run.
+        """
+        center, plus, minus = self.split(genomes.data)
+        self.center = center
+        if self.adaptive:
+            self.sigma = float(np.sqrt(np.mean(((plus - minus) / 2) ** 2)))
+
+    def next_population(self, genomes, fitness, rng, profiler=NULL_PROFILER):
+        profiler.start()
+        center, plus, minus = self.split(genomes.data)
+        offset = len(genomes) - 2 * self.pairs
+        utilities = centered_ranks(np.asarray(fitness, dtype=np.float64)[offset:])
+        weights = utilities[:self.pairs] - utilities[self.pairs:]
+        profiler.lap('shape')
+
+        # (plus - minus) / 2 is sigma * eps, read back from the rows themselves
+        steps = (plus - minus) / 2
+        total = np.abs(weights).sum()
+        if total > 0:
+            self.center = center + self.learning_rate * (weights @ steps) / total
+        else:
+            self.center = center
+        if self.adaptive:
+            self.adapt_sigma(weights, steps / self.sigma)
+        profiler.lap('recenter')
+
+        genomes = self.sample(rng)
+        profiler.lap('sample')
+        return genomes
+
+    def adapt_sigma(self, weights, eps):
+        """Cumulative step-size adaptation of sigma from this generation's selected step."""
+        norm = math.sqrt(float(weights @ weights))
+        if norm == 0:
+            return
+        # Normalized so that, under random selection, z ~ N(0, I)
+        z = (weights @ eps) / norm
+        mu_eff = float(np.abs(weights).sum()) ** 2 / norm ** 2
+        n = PARAMETER_COUNT
+        c = (mu_eff + 2) / (n + mu_eff + 5)
+        damping = 1 + 2 * max(0.0, math.sqrt((mu_eff - 1) / (n + 1)) - 1) + c
+        expected_norm = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+        self.path = (1 - c) * self.path + math.sqrt(c * (2 - c)) * z
+        sigma = self.sigma * math.exp(c / damping * (np.linalg.norm(self.path) / expected_norm - 1))
+        self.sigma = min(max(sigma, self.min_sigma), self.max_sigma)
+        logger.debug("ES step size: %.4f", self.sigma)
+
+OPTIMIZERS = {'ga': GeneticOptimizer, 'es': EvolutionStrategy}
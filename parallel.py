@@ -0,0 +1,118 @@
+# parallel.py
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from neural_network import PopulationBrain, flatten_genome
+from scheduler import EvaluationScheduler, GenerationResult
+from simulation import PopulationSimulator
+
+logger = logging.getLogger(__name__)
+
+def genome_matrix(population):
+    """
+    Pack a population into an (N, PARAMETER_COUNT) float64 matrix.
+    Accepts a list of Birds, a list of genome dicts or an existing matrix.
+    """
+    if isinstance(population, np.ndarray):
+        return np.ascontiguousarray(population, dtype=np.float64)
+    return np.stack([flatten_genome(item.get_genome() if hasattr(item, 'get_genome') else item)
+                     for item in population])
+
+def evaluate_chunk(genomes, course_seeds, sim_options, max_frames=None, limits=None, profiler=None):
+    """
+    Worker entry point: run one headless simulation of `genomes` and return
+    only the score array and the GenerationResult.
+    course_seeds is one seed or a list of them; with K courses every genome
+    plays all of them in a single batched simulation and scores the mean.
+    limits are EvaluationScheduler keyword arguments (see
+    EvaluationScheduler.limits); max_frames caps the run either way.
+    profiler only makes sense in-process (see profiling.Profiler).
+    """
+    if not isinstance(course_seeds, (list, tuple, np.ndarray)):
+        course_seeds = [course_seeds]
+    count, courses = len(genomes), len(course_seeds)
+    brain_genomes = np.tile(genomes, (courses, 1)) if courses > 1 else genomes
+    brain = PopulationBrain.from_flat(brain_genomes)
+    sim = PopulationSimulator(count * courses, courses=list(course_seeds),
+                              course_of=np.repeat(np.arange(courses), count), profiler=profiler,
+                              **sim_options)
+    scheduler = EvaluationScheduler(**(limits or {}))
+    if max_frames is not None:
+        scheduler.max_frames = min(max_frames, scheduler.max_frames or max_frames)
+    tiled = brain_genomes if scheduler.stop_identical else None
+    result = scheduler.run_simulator(sim, brain, tiled)
+    if courses == 1:
+        return sim.score, result
+    return sim.score.reshape(courses, count).mean(axis=0), result
+
+def merge_results(results):
+    """One GenerationResult for a generation evaluated in several chunks."""
+    reasons = [result.reason for result in results if result.truncated]
+    return GenerationResult(max(result.frames for result in results),
+                            max(result.seconds for result in results),
+                            bool(reasons), reasons[0] if reasons else None)
+
+class ParallelEvaluator:
+    """
+    Drop-in replacement for game.run_generation() + game.get_fitness_scores().
+    The population is split into one chunk per worker; every chunk plays the
+    same seeded course(s), so scores stay comparable across chunks. With
+    courses > 1 each genome plays several courses (batched in one
+    simulation) and its fitness is the mean.
+    Genomes travel to the workers as flat float64 rows, never as Birds.
+    """
+    def __init__(self, workers=None, courses=1, seed=None, sim_options=None, max_frames=None,
+                 scheduler=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.courses = courses
+        self.sim_options = dict(sim_options or {})
+        self.max_frames = max_frames
+        # Budget per chunk; the result of the last evaluate() is kept for the caller
+        self.scheduler = scheduler
+        self.last_result = None
+        self.rng = np.random.default_rng(seed)
+        # Spawned workers never inherit the parent's pygame/SDL state
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def course_seeds(self):
+        """Fresh course seeds for one generation, shared by every chunk."""
+        return [int(seed) for seed in self.rng.integers(0, 2**63 - 1, size=self.courses)]
+
+    def evaluate(self, population, course_seeds=None):
+        """
+        Score every genome and return the fitness list in population order.
+        When the population holds Birds their `score` is set as well, so
+        select_parents works unchanged.
+        """
+        genomes = genome_matrix(population)
+        if course_seeds is None:
+            course_seeds = self.course_seeds()
+        chunks = [chunk for chunk in np.array_split(genomes, min(self.workers, len(genomes))) if len(chunk)]
+
+        limits = self.scheduler.limits(partial=True) if self.scheduler is not None else None
+        futures = [self.executor.submit(evaluate_chunk, chunk, list(course_seeds), self.sim_options,
+                                        self.max_frames, limits)
+                   for chunk in chunks]
+        scores, results = zip(*[future.result() for future in futures])
+        fitness = np.concatenate(scores)
+        self.last_result = merge_results(results)
+        logger.debug("Evaluated %d genomes in %d chunks on %d course(s).",
+                     len(genomes), len(chunks), len(course_seeds))
+
+        fitness = fitness.tolist()
+        if not isinstance(population, np.ndarray):
+            for item, score in zip(population, fitness):
+                if hasattr(item, 'score'):
+                    item.score = score
+        return fitness
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,73 +1,59 @@
-import pygame
-import random
+import logging
+from assets import get_dimensions, get_sprites
+from utils import get_rng
+
+logger = logging.getLogger(__name__)
 
 class Pipe:
     VELOCITY = 5
     WIDTH = 52      # Pipe image width
     COLOR = (0, 255, 0)  # Fallback color if image fails to load
 
-    def __init__(self, x, screen_height, base_height):
+    def __init__(self, x, screen_height, base_height, rng=None, gap_center=None):
         self.x = x
         self.screen_height = screen_height
         self.base_height = base_height  # New: store how tall the base is
         self.gap = 180                  # Distance between top and bottom pipes
         self.passed = False
+        self.rng = get_rng(rng)           # Draws the gap position
+
+        # Pipe size comes from the asset cache; images are only needed to draw
+        dims = get_dimensions()
+        self.WIDTH = dims.pipe_width
+        self.image_height = dims.pipe_height
+
+        # Place the gap where the course says, or randomly, respecting the base
+        self.set_height(gap_center)
+
+    @property
+    def top_image(self):
+        return get_sprites().pipe_top
+
+    @property
+    def bottom_image(self):
+        return get_sprites().pipe_bottom
 
-        # Load pipe image
-        self.load_image('imgs/pipe.png')
-
-        # Randomly set how high or low to place the gap, respecting the base
-        self.set_height()
-
-    def load_image(self, path):
-        """Load the pipe image and scale it to make it bigger."""
-        try:
-            original_image = pygame.image.load(path).convert_alpha()
-
-            # Define the scale factor (e.g., 1.5 for 150% size increase)
-            scale_factor = 1.7
-            scaled_width = int(original_image.get_width() * scale_factor)
-            scaled_height = int(original_image.get_height() * scale_factor)
-
-            # Scale the images
-            self.top_image = pygame.transform.flip(
-                pygame.transform.scale(original_image, (scaled_width, scaled_height)),
-                False,
-                True
-            )
-            self.bottom_image = pygame.transform.scale(original_image, (scaled_width, scaled_height))
-
-            # Update width and height attributes
-            self.WIDTH = scaled_width
-            self.image_height = scaled_height
-
-            print("Loaded and scaled pipe image.")
-        except pygame.error as e:
-            print(f"Unable to load pipe image {path}: {e}")
-            self.top_image = None
-            self.bottom_image = None
-            self.image_height = 320  # Fallback
-            print("Using colored rectangles as placeholders.")
-
-    def set_height(self):
+    def set_height(self, gap_center=None):
         """
         Clamp the gap so the bottom of the gap doesn't go below the base.
         The top of the gap won't go above the top of the screen.
+        A precomputed gap_center (from a PipeCourse) skips the random draw.
         """
         half_gap = self.gap // 2
 
-        # The lowest valid center for the gap is half_gap from the top
-        min_center = half_gap
-        # The highest valid center: (screen_height - base_height) - half_gap
-        # so the gap won't go into the base.
-        max_center = (self.screen_height - self.base_height) - half_gap
+        if gap_center is None:
+            # The lowest valid center for the gap is half_gap from the top
+            min_center = half_gap
+            # The highest valid center: (screen_height - base_height) - half_gap
+            # so the gap won't go into the base.
+            max_center = (self.screen_height - self.base_height) - half_gap
 
-        if max_center < min_center:
-            # If this happens, your gap + base is too big for the screen
-            gap_center = (self.screen_height - self.base_height) // 2
-            print("Warning: gap + base too large. Using fallback center.")
-        else:
-            gap_center = random.randint(min_center, max_center)
+            if max_center < min_center:
+                # If this happens, your gap + base is too big for the screen
+                gap_center = (self.screen_height - self.base_height) // 2
+                logger.warning("Gap + base too large. Using fallback center.")
+            else:
+                gap_center = int(self.rng.integers(min_center, max_center + 1))
 
         # The top pipe's bottom is at (gap_center - half_gap),
         # so its top is that minus the pipe height.
@@ -80,8 +66,8 @@ class Pipe:
         self.top_pipe_height = (gap_center - half_gap)  # y-pos of top pipe's bottom
         self.bottom_pipe_height = self.screen_height - (gap_center + half_gap)
 
-        print(f"[DEBUG] gap_center={gap_center}, top={self.top}, bottom={self.bottom}, "
-              f"top_pipe_height={self.top_pipe_height}, bottom_pipe_height={self.bottom_pipe_height}")
+        logger.debug("gap_center=%d, top=%d, bottom=%d, top_pipe_height=%d, bottom_pipe_height=%d",
+                     gap_center, self.top, self.bottom, self.top_pipe_height, self.bottom_pipe_height)
 
     def move(self):
         """Move the pipe to the left."""
@@ -89,35 +75,31 @@ class Pipe:
 
     def draw(self, screen):
         """Draw top and bottom pipes."""
-        if self.top_image and self.bottom_image:
-            screen.blit(self.top_image, (self.x, self.top))
-            screen.blit(self.bottom_image, (self.x, self.bottom))
+        sprites = get_sprites()
+        if sprites.pipe_top and sprites.pipe_bottom:
+            screen.blit(sprites.pipe_top, (self.x, self.top))
+            screen.blit(sprites.pipe_bottom, (self.x, self.bottom))
         else:
             # Fallback: draw rectangles
+            import pygame
             top_rect = pygame.Rect(self.x, self.top, self.WIDTH, self.image_height)
             bottom_rect = pygame.Rect(self.x, self.bottom, self.WIDTH, self.image_height)
             pygame.draw.rect(screen, self.COLOR, top_rect)
             pygame.draw.rect(screen, self.COLOR, bottom_rect)
 
     def collide(self, bird):
-        """Check if the bird collides with either pipe."""
+        """Check if the bird collides with either pipe (same test as Rect.colliderect)."""
         bird_rect = bird.rect
-
-        if self.top_image and self.bottom_image:
-            top_pipe_rect = pygame.Rect(self.x, self.top, self.WIDTH, self.image_height)
-            bottom_pipe_rect = pygame.Rect(self.x, self.bottom, self.WIDTH, self.image_height)
-        else:
-            top_pipe_rect = pygame.Rect(self.x, self.top, self.WIDTH, self.image_height)
-            bottom_pipe_rect = pygame.Rect(self.x, self.bottom, self.WIDTH, self.image_height)
-
-        if bird_rect.colliderect(top_pipe_rect) or bird_rect.colliderect(bottom_pipe_rect):
-            print(f"Collision detected: bird={bird_rect}, pipe_x={self.x}")
-            return True
-        return False
+        hit = (bird_rect.left < self.x + self.WIDTH and bird_rect.right > self.x
+               and ((bird_rect.top < self.top + self.image_height and bird_rect.bottom > self.top)
+                    or (bird_rect.top < self.bottom + self.image_height and bird_rect.bottom > self.bottom)))
+        if hit:
+            logger.debug("Collision detected: bird=%s, pipe_x=%s", bird_rect, self.x)
+        return hit
 
     def off_screen(self):
         """Check if the pipe is off the left edge of the screen."""
         off = self.x < -self.WIDTH
         if off:
-            print(f"Pipe at x={self.x} is off-screen.")
+            logger.debug("Pipe at x=%s is off-screen.", self.x)
         return off
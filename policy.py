@@ -0,0 +1,123 @@
+# policy.py
+"""
+Inference-only policies frozen from trained genomes.
+
+compile_policy() turns one genome or a whole population into the fastest
+evaluator for its batch size:
+- ScalarPolicy: the 4-5-1 network unrolled into straight-line Python with
+  the weights baked in as constants, for one or a few birds. No NumPy call
+  overhead per decision.
+- BufferedPolicy: the batched PopulationBrain forward pass with every
+  intermediate written into preallocated buffers (`out=`), so stepping a
+  large population allocates nothing per frame.
+Both compute the same network as NeuralNetwork.forward, up to the order of
+floating-point summation, and can be passed to PopulationSimulator as its
+policy.
+"""
+import math
+import numpy as np
+from neural_network import PARAMETER_COUNT, PopulationBrain, flatten_genome, unflatten_genome
+
+# Up to this many birds, looping over unrolled scalar networks beats the
+# batched NumPy forward pass (see bench.bench_policies)
+SCALAR_BATCH_LIMIT = 4
+
+def _flat_rows(genomes):
+    """(N, PARAMETER_COUNT) float64 rows from a genome dict, a flat row or a matrix."""
+    if isinstance(genomes, dict):
+        return flatten_genome(genomes)[None, :]
+    rows = np.asarray(getattr(genomes, 'data', genomes), dtype=np.float64)
+    return rows.reshape(-1, PARAMETER_COUNT)
+
+def _scalar_source(genome):
+    """Source of forward(x0, x1, x2, x3) for one genome, with its weights as literals."""
+    w1, b1, w2, b2 = genome['w1'], genome['b1'], genome['w2'], genome['b2']
+    lines = ["def forward(x0, x1, x2, x3):"]
+    for j in range(len(b1)):
+        terms = " + ".join(f"x{i} * {float(w1[i, j])!r}" for i in range(w1.shape[0]))
+        lines.append(f"    h{j} = tanh({terms} + {float(b1[j])!r})")
+    terms = " + ".join(f"h{j} * {float(w2[j, 0])!r}" for j in range(len(b1)))
+    lines.append(f"    return tanh({terms} + {float(b2[0])!r})")
+    return "\n".join(lines)
+
+class ScalarPolicy:
+    """One unrolled pure-Python network per genome."""
+    def __init__(self, genomes):
+        self.functions = []
+        for row in _flat_rows(genomes):
+            namespace = {'tanh': math.tanh}
+            exec(_scalar_source(unflatten_genome(row)), namespace)
+            self.functions.append(namespace['forward'])
+        self.size = len(self.functions)
+
+    def forward_one(self, inputs, index=0):
+        """Network output for one bird, like NeuralNetwork.forward."""
+        if isinstance(inputs, np.ndarray):
+            # Python floats: arithmetic on NumPy scalars is several times slower
+            inputs = inputs.tolist()
+        return self.functions[index](*inputs)
+
+    def forward(self, inputs, indices=None):
+        """(n,) outputs for an (n, 4) input matrix, as PopulationBrain.forward."""
+        if indices is None:
+            indices = range(len(inputs))
+        functions = self.functions
+        return np.array([functions[i](*row) for i, row in zip(indices, np.asarray(inputs).tolist())])
+
+    def decide(self, inputs, indices=None):
+        return self.forward(inputs, indices) > 0.5
+
+    __call__ = decide
+
+class BufferedPolicy(PopulationBrain):
+    """
+    PopulationBrain whose forward pass reuses preallocated buffers. The
+    returned outputs are a view into a buffer that the next call overwrites.
+    Buffers hold one row per genome and grow if a call repeats genomes.
+    """
+    def set_parameters(self, w1, b1, w2, b2, dtype=np.float64):
+        super().set_parameters(w1, b1, w2, b2, dtype)
+        self._allocate(self.size)
+
+    def _allocate(self, n):
+        self._x = np.empty((n, 1, 4), dtype=self.dtype)
+        self._hidden = np.empty((n, 1, 5), dtype=self.dtype)
+        self._output = np.empty((n, 1, 1), dtype=self.dtype)
+        self._mask = np.empty(n, dtype=bool)
+        # Weights gathered for the birds still alive
+        self._weights = tuple(np.empty((n,) + w.shape[1:], dtype=self.dtype)
+                              for w in (self.w1, self.b1, self.w2, self.b2))
+
+    def forward(self, inputs, indices=None):
+        n = len(inputs)
+        if n > len(self._x):
+            self._allocate(n)
+        w1, b1, w2, b2 = self.w1, self.b1, self.w2, self.b2
+        if indices is not None and not self.selects_all(indices):
+            w1, b1, w2, b2 = (np.take(w, indices, axis=0, out=buffer[:n])
+                              for w, buffer in zip((w1, b1, w2, b2), self._weights))
+        x, hidden, output = self._x[:n], self._hidden[:n], self._output[:n]
+        x[:, 0, :] = inputs
+        np.matmul(x, w1, out=hidden)
+        np.add(hidden, b1, out=hidden)
+        np.tanh(hidden, out=hidden)
+        np.matmul(hidden, w2, out=output)
+        np.add(output, b2, out=output)
+        np.tanh(output, out=output)
+        return output[:, 0, 0]
+
+    def decide(self, inputs, indices=None):
+        outputs = self.forward(inputs, indices)
+        return np.greater(outputs, 0.5, out=self._mask[:len(outputs)])
+
+    __call__ = decide
+
+def compile_policy(genomes, dtype=np.float64):
+    """
+    Freeze a genome dict, a flat genome, a GenomeMatrix or an
+    (N, PARAMETER_COUNT) matrix into the fastest policy for N birds.
+    """
+    rows = _flat_rows(genomes)
+    if len(rows) <= SCALAR_BATCH_LIMIT:
+        return ScalarPolicy(rows)
+    return BufferedPolicy.from_flat(rows, dtype)
@@ -0,0 +1,137 @@
+# profiling.py
+import cProfile
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+class NullProfiler:
+    """Stand-in used when profiling is off: every hook is an empty method."""
+    enabled = False
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def stage(self, stage):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def begin_generation(self, generation):
+        pass
+
+    def end_generation(self):
+        return None
+
+NULL_PROFILER = NullProfiler()
+
+class Profiler(NullProfiler):
+    """
+    Phase timers and counters for the hot paths, rolled up per generation.
+    Timing is lap-based: start() sets a mark and every lap(phase) charges the
+    time since the previous mark to `phase`, so a frame split into k phases
+    costs k + 1 perf_counter() calls. Counters (bird-steps, collisions,
+    forward rows, ...) are plain dict increments.
+    The stages of a generation (evaluate, breed, ...) enclose those phases,
+    so they keep a mark of their own: stage(name) charges the time since the
+    previous stage (or begin_generation) and is unaffected by start().
+    Cheap enough to leave on; with `jsonl_path` and/or `prometheus_path` every
+    generation is exported, and `profile_generation` captures that one
+    generation with cProfile into `profile_path`.
+    """
+    enabled = True
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, profile_generation=None,
+                 profile_path='generation.prof'):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.profile_generation = profile_generation
+        self.profile_path = profile_path
+        self.seconds = defaultdict(float)
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.total_seconds = defaultdict(float)
+        self.total_stages = defaultdict(float)
+        self.total_counters = defaultdict(int)
+        self.generation = None
+        self.generation_start = None
+        self.mark = time.perf_counter()
+        self.stage_mark = self.mark
+        self.cprofile = None
+
+    def start(self):
+        self.mark = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.seconds[phase] += now - self.mark
+        self.mark = now
+
+    def stage(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] += now - self.stage_mark
+        self.stage_mark = now
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def begin_generation(self, generation):
+        self.generation = generation
+        self.seconds.clear()
+        self.stages.clear()
+        self.counters.clear()
+        if generation == self.profile_generation:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.generation_start = time.perf_counter()
+        self.stage_mark = self.generation_start
+        self.start()
+
+    def end_generation(self):
+        """Roll up the generation, export it and return its summary dict."""
+        wall = time.perf_counter() - self.generation_start
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.profile_path)
+            logger.info("cProfile of generation %d written to %s.", self.generation, self.profile_path)
+            self.cprofile = None
+        for phase, seconds in self.seconds.items():
+            self.total_seconds[phase] += seconds
+        for stage, seconds in self.stages.items():
+            self.total_stages[stage] += seconds
+        for name, n in self.counters.items():
+            self.total_counters[name] += n
+        summary = dict(generation=self.generation, wall_seconds=wall, stages=dict(self.stages),
+                       phases=dict(self.seconds), counters={name: int(n) for name, n in self.counters.items()})
+        if self.jsonl_path:
+            with open(self.jsonl_path, 'a') as f:
+                f.write(json.dumps(summary) + '\n')
+        if self.prometheus_path:
+            self.write_prometheus()
+        logger.debug("Generation %d profile: %s", self.generation, summary)
+        return summary
+
+    def write_prometheus(self):
+        """Cumulative totals in the Prometheus text format (textfile collector style)."""
+        lines = ["# TYPE flappy_stage_seconds_total counter"]
+        lines += [f'flappy_stage_seconds_total{{stage="{stage}"}} {seconds!r}'
+                  for stage, seconds in sorted(self.total_stages.items())]
+        lines.append("# TYPE flappy_phase_seconds_total counter")
+        lines += [f'flappy_phase_seconds_total{{phase="{phase}"}} {seconds!r}'
+                  for phase, seconds in sorted(self.total_seconds.items())]
+        lines.append("# TYPE flappy_events_total counter")
+        lines += [f'flappy_events_total{{name="{name}"}} {n}' for name, n in sorted(self.total_counters.items())]
+        lines.append("# TYPE flappy_generation gauge")
+        lines.append(f"flappy_generation {self.generation}")
+        # Write-then-rename so a scraper never reads a half-written file
+        tmp = self.prometheus_path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.prometheus_path)
@@ -0,0 +1,90 @@
+# renderer.py
+import logging
+import pygame
+
+logger = logging.getLogger(__name__)
+
+class DirtyRectRenderer:
+    """
+    Draws a Game frame by touching only what changed since the last one.
+    - The background is kept as one pre-composited surface; last frame's
+      pipes, birds and text are erased by copying it back over them.
+    - Only the scrolling base strip, the pipe columns, the bird column and
+      the stats text are redrawn, and only those rectangles are pushed to
+      the window with pygame.display.update(rects).
+    - At most `max_birds` living birds are drawn (an even sample of the
+      survivors), so thousands of birds cost no more than `max_birds` blits.
+    - The stats text is rendered again only when its values change.
+    """
+    def __init__(self, screen, max_birds=50, text_color=(0, 0, 0)):
+        self.screen = screen
+        self.max_birds = max_birds
+        self.text_color = text_color
+        self.background = None
+        self.font = None
+        self.texts = {}      # label -> (value, surface) of the last rendered stats
+        self.previous = []   # Rects drawn on the last frame, erased on the next
+
+    def reset(self, game):
+        """Composite the static background and show it in full (first frame)."""
+        self.background = game.bg.copy()
+        self.screen.blit(self.background, (0, 0))
+        self.previous = []
+        pygame.display.flip()
+        logger.debug("Renderer reset with a full redraw.")
+
+    def stats_text(self, label, value):
+        """Cached surface of one stats line, re-rendered only when `value` changes."""
+        cached = self.texts.get(label)
+        if cached is None or cached[0] != value:
+            if self.font is None:
+                self.font = pygame.font.SysFont('Arial', 24)
+            cached = (value, self.font.render(f"{label}: {value}", True, self.text_color))
+            self.texts[label] = cached
+        return cached[1]
+
+    def representative_birds(self, population):
+        """
+        The living birds to draw. Every living bird has passed the same pipes,
+        so they all share the top score; past `max_birds` an even sample of
+        them is drawn instead.
+        """
+        birds = [bird for bird in population if bird.is_alive]
+        if len(birds) <= self.max_birds:
+            return birds
+        return [birds[i * len(birds) // self.max_birds] for i in range(self.max_birds)]
+
+    def draw(self, game):
+        """Draw the game's current state and update the dirty parts of the window."""
+        if self.background is None:
+            self.reset(game)
+        screen = self.screen
+        ground = game.screen_height - game.base_height
+        for rect in self.previous:
+            screen.blit(self.background, rect, rect)
+
+        # The base scrolls every frame, so its strip is always redrawn
+        screen.blit(game.base, (game.base_x, ground))
+        screen.blit(game.base, (game.base_x + game.base_width, ground))
+        dirty = [pygame.Rect(0, ground, game.screen_width, game.base_height)]
+
+        for pipe in game.pipes:
+            if pipe.x + pipe.WIDTH > 0 and pipe.x < game.screen_width:
+                pipe.draw(screen)
+                dirty.append(pygame.Rect(pipe.x, 0, pipe.WIDTH, game.screen_height))
+
+        birds = self.representative_birds(game.population)
+        for bird in birds:
+            bird.draw(screen)
+        if birds:
+            dirty.append(pygame.Rect(tuple(birds[0].rect)).unionall([tuple(bird.rect) for bird in birds[1:]]))
+
+        y = 10
+        for label, value in (("Gaps Passed", game.gaps_passed), ("Best Record", game.best_record),
+                             ("Speed", game.speed_label)):
+            text = self.stats_text(label, value)
+            dirty.append(screen.blit(text, (10, y)))
+            y += 30
+
+        pygame.display.update(self.previous + dirty)
+        self.previous = dirty
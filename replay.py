@@ -0,0 +1,114 @@
+# replay.py
+"""
+Watch stored genomes play, without training.
+
+    python replay.py                                  # best_genome.pkl
+    python replay.py --checkpoint-dir ck --generations 10 50 latest
+    python replay.py --checkpoint-dir ck --frames-dir frames --max-frames 1800
+
+Every genome is drawn through the usual Game/Bird/Pipe path on one fixed
+seeded course. With --frames-dir nothing is shown: SDL's dummy video
+driver is used and every frame is written as a PNG, so it also works on a
+machine without a display.
+"""
+import argparse
+import logging
+import os
+import pickle
+from utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+def load_genomes(pkl_path='best_genome.pkl', checkpoint_dir=None, generations=('latest',)):
+    """
+    (label, genome dict) pairs to replay: the pickled best genome (if the
+    file exists) followed by the elite of each requested archived generation.
+    The archive is only read, never created or repaired; a missing
+    checkpoint_dir raises FileNotFoundError.
+    """
+    genomes = []
+    if pkl_path and os.path.exists(pkl_path):
+        with open(pkl_path, 'rb') as f:
+            genomes.append((os.path.basename(pkl_path), pickle.load(f)))
+    if checkpoint_dir:
+        from checkpoint import GenomeArchive
+        # Training may still be appending to it
+        archive = GenomeArchive(checkpoint_dir, read_only=True)
+        for generation in generations:
+            record = archive.record(None if generation == 'latest' else int(generation))
+            genomes.append((f"generation {record['generation']}", archive.elite(record['generation'])))
+    return genomes
+
+def replay(genomes, seed=0, frames_dir=None, max_frames=None, fps=60, screen_width=500, screen_height=700):
+    """
+    Fly the genome dicts on the course `seed` until all of them crash or
+    `max_frames` have been drawn. Returns the birds' scores.
+    """
+    if frames_dir:
+        # Must be set before pygame opens a display
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.makedirs(frames_dir, exist_ok=True)
+    import pygame
+    from bird import Bird
+    from game import Game
+
+    pygame.init()
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    pygame.display.set_caption("Flappy Bird AI - replay")
+
+    birds = [Bird(x=100, y=350, genome=genome) for genome in genomes]
+    game = Game(birds, screen)
+    game.reset(birds, seed=seed)
+
+    frame = 0
+    while any(bird.is_alive for bird in birds) and (max_frames is None or frame < max_frames):
+        if not frames_dir:
+            game.handle_events()
+        game.step(render=True)
+        if frames_dir:
+            pygame.image.save(screen, os.path.join(frames_dir, f"frame_{frame:06d}.png"))
+        else:
+            pygame.display.flip()
+            game.clock.tick(fps)
+        frame += 1
+
+    scores = [bird.score for bird in birds]
+    logger.info("Replay finished after %d frames.", frame)
+    pygame.quit()
+    return scores
+
+def main(pkl='best_genome.pkl', checkpoint_dir=None, generations=('latest',), seed=0, frames_dir=None,
+         max_frames=None, fps=60):
+    genomes = load_genomes(pkl, checkpoint_dir, generations)
+    if not genomes:
+        raise SystemExit("Nothing to replay: no best genome file and no checkpoint archive.")
+    labels = [label for label, _ in genomes]
+    logger.info("Replaying %s on course %d.", ", ".join(labels), seed)
+    scores = replay([genome for _, genome in genomes], seed, frames_dir, max_frames, fps)
+    for label, score in zip(labels, scores):
+        logger.info("%s: score %d", label, score)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay stored genomes on a seeded course.")
+    parser.add_argument('--pkl', default='best_genome.pkl',
+                        help="Pickled best genome to replay as the baseline ('' to skip).")
+    parser.add_argument('--checkpoint-dir', default=None,
+                        help="Checkpoint archive to take generation elites from.")
+    parser.add_argument('--generations', nargs='+', default=['latest'],
+                        help="Archived generations whose elites are replayed ('latest' or numbers).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the pipe course.")
+    parser.add_argument('--frames-dir', default=None,
+                        help="Write every frame as a PNG here instead of opening a window.")
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help="Stop after N frames (good birds may never crash).")
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args(argv)
+    if args.frames_dir and args.max_frames is None:
+        parser.error("--frames-dir needs --max-frames")
+    return args
+
+if __name__ == "__main__":
+    options = vars(parse_args())
+    configure_logging(options.pop('log_level'))
+    main(**options)
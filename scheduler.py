@@ -0,0 +1,104 @@
+# scheduler.py
+import logging
+import time
+from collections import namedtuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How one generation's evaluation ended; reason is None unless it was truncated
+GenerationResult = namedtuple('GenerationResult', ['frames', 'seconds', 'truncated', 'reason'])
+
+def survivors_identical(sim, genomes):
+    """
+    True when every bird still alive in `sim` has the same genome row, course
+    and physical state. From then on they fly identical trajectories, so
+    the ranking of the generation can no longer change.
+    """
+    alive = np.flatnonzero(sim.alive)
+    if len(alive) < 2:
+        return False
+    first = alive[0]
+    return bool((sim.y[alive] == sim.y[first]).all()
+                and (sim.velocity[alive] == sim.velocity[first]).all()
+                and (sim.flap_cooldown[alive] == sim.flap_cooldown[first]).all()
+                and (sim.course_of[alive] == sim.course_of[first]).all()
+                and (genomes[alive] == genomes[first]).all())
+
+class EvaluationScheduler:
+    """
+    Budget for evaluating one generation, so a population that has learned to
+    fly forever can't stall training.
+    - max_frames / max_score stop the generation once it has run that many
+      frames or its survivors have passed that many pipes.
+    - max_seconds is a wall-clock budget per generation (per chunk on
+      workers, as a safety net).
+    - stop_identical ends the generation early once all survivors are
+      clones in the same state (checked every `check_every` frames).
+    - adaptive raises the frame and score caps by `growth` every time a
+      generation reaches them, so the caps follow the population as it improves.
+    """
+    def __init__(self, max_frames=None, max_score=None, max_seconds=None, stop_identical=False,
+                 adaptive=False, growth=1.5, check_every=60):
+        self.max_frames = max_frames
+        self.max_score = max_score
+        self.max_seconds = max_seconds
+        self.stop_identical = stop_identical
+        self.adaptive = adaptive
+        self.growth = growth
+        self.check_every = check_every
+
+    def limits(self, partial=False):
+        """
+        Keyword arguments for an equivalent scheduler, e.g. in a worker process.
+        Identical-survivor stopping is only fair over the whole population,
+        so it is left out for a `partial` one (a worker's chunk, or only the
+        genomes missing from the fitness cache).
+        """
+        return dict(max_frames=self.max_frames, max_score=self.max_score, max_seconds=self.max_seconds,
+                    stop_identical=self.stop_identical and not partial, check_every=self.check_every)
+
+    def should_stop(self, frames, score, seconds):
+        """Reason to truncate the generation now, or None to keep going."""
+        if self.max_frames is not None and frames >= self.max_frames:
+            return f"frame cap {self.max_frames}"
+        if self.max_score is not None and score >= self.max_score:
+            return f"score cap {self.max_score}"
+        if self.max_seconds is not None and seconds >= self.max_seconds:
+            return f"time budget {self.max_seconds}s"
+        return None
+
+    def check_identical(self, frames):
+        return self.stop_identical and frames % self.check_every == 0
+
+    def run_simulator(self, sim, policy, genomes=None):
+        """Step a PopulationSimulator until every bird is dead or the budget runs out."""
+        start = time.perf_counter()
+        first_frame = sim.frame
+        reason = None
+        while sim.alive.any():
+            frames = sim.frame - first_frame
+            # Every alive bird has passed every pipe so far, so gaps_passed is the best live score
+            reason = self.should_stop(frames, sim.gaps_passed, time.perf_counter() - start)
+            if reason is None and genomes is not None and self.check_identical(frames) \
+                    and survivors_identical(sim, genomes):
+                reason = "identical survivors"
+            if reason is not None:
+                break
+            # Fast-forwarding stops at the frame cap and at the next identical-survivors check
+            limit = None if self.max_frames is None else self.max_frames - frames
+            if genomes is not None and self.stop_identical:
+                limit = min(limit or self.check_every, self.check_every - frames % self.check_every)
+            sim.advance(policy, limit)
+        return GenerationResult(sim.frame - first_frame, time.perf_counter() - start, reason is not None, reason)
+
+    def record(self, result):
+        """Feed back a finished generation (adaptive caps grow when they were hit)."""
+        if not (self.adaptive and result.truncated):
+            return
+        if result.reason.startswith("frame cap"):
+            self.max_frames = int(self.max_frames * self.growth)
+            logger.info("Raised frame cap to %d.", self.max_frames)
+        elif result.reason.startswith("score cap"):
+            self.max_score = int(np.ceil(self.max_score * self.growth))
+            logger.info("Raised score cap to %d.", self.max_score)
@@ -0,0 +1,390 @@
+# simulation.py
+import logging
+import numpy as np
+from course import PipeCourse
+from profiling import NULL_PROFILER
+from utils import get_rng
+
+logger = logging.getLogger(__name__)
+
+
+class PipeState:
+    """
+    Geometry of one pipe pair, without any images.
+    gap_center and the fields derived from it hold one value per course.
+    """
+    __slots__ = ('x', 'gap_center', 'passed', 'top_pipe_height', 'bottom', 'bottom_pipe_height')
+
+    def __init__(self, x, gap_center, half_gap, screen_height):
+        self.x = x
+        self.gap_center = gap_center
+        self.passed = False
+        # Same fields as Pipe.set_height
+        self.top_pipe_height = gap_center - half_gap   # y-pos of top pipe's bottom
+        self.bottom = gap_center + half_gap            # y-pos of bottom pipe's top
+        self.bottom_pipe_height = screen_height - self.bottom
+
+
+class PipeQueue:
+    """
+    The pipes on screen in spawn order, which is also left-to-right order.
+    Every bird has the same x, so at most one pipe can overlap them and the
+    nearest pipe ahead is the same for all of them. Both are tracked as
+    indices that only move forward, instead of scanning every pipe for
+    every bird.
+    """
+    def __init__(self, pipe_width, bird_left, bird_right, bird_x):
+        self.pipes = []
+        self.pipe_width = pipe_width
+        self.bird_left = bird_left
+        self.bird_right = bird_right
+        self.bird_x = bird_x
+        self.collision_index = 0
+        self.nearest_index = 0
+
+    def __iter__(self):
+        return iter(self.pipes)
+
+    def __len__(self):
+        return len(self.pipes)
+
+    def append(self, pipe):
+        self.pipes.append(pipe)
+
+    def advance(self):
+        """Move the tracked indices past pipes that are now behind the birds."""
+        pipes, width = self.pipes, self.pipe_width
+        while self.collision_index < len(pipes) and pipes[self.collision_index].x + width <= self.bird_left:
+            self.collision_index += 1
+        while self.nearest_index < len(pipes) and pipes[self.nearest_index].x + width <= self.bird_x:
+            self.nearest_index += 1
+
+    def drop_off_screen(self):
+        """Remove pipes past the left edge (always the oldest ones)."""
+        removed = 0
+        while removed < len(self.pipes) and self.pipes[removed].x < -self.pipe_width:
+            removed += 1
+        if removed:
+            del self.pipes[:removed]
+            self.collision_index = max(self.collision_index - removed, 0)
+            self.nearest_index = max(self.nearest_index - removed, 0)
+        return removed
+
+    def collision_pipe(self):
+        """The only pipe that horizontally overlaps the birds, or None."""
+        if self.collision_index < len(self.pipes):
+            pipe = self.pipes[self.collision_index]
+            if pipe.x < self.bird_right:
+                return pipe
+        return None
+
+    def nearest_pipe(self):
+        """First pipe whose right edge is still ahead of the birds (the AI's input), or None."""
+        if self.nearest_index < len(self.pipes):
+            return self.pipes[self.nearest_index]
+        return None
+
+
+class PopulationSimulator:
+    """
+    Structure-of-arrays version of the Game rules.
+    Every bird's state lives in one NumPy array per field, so a frame costs a
+    fixed number of whole-array operations per pipe instead of one
+    Bird.update / Pipe.collide call per bird.
+    The defaults match the shipped images: 34x24 birds, 52x320 pipes scaled
+    by 1.7 and a 112 px base on a 500x700 screen.
+    Pipes come from `courses`: PipeCourse objects or seeds to build them from.
+    With several courses, course_of[i] says which one bird i plays; pipe x
+    positions don't depend on the gaps, so all courses share the same pipes
+    and only the gap heights differ.
+    `profiler` (see profiling.Profiler) gets per-phase laps and counters.
+    Only birds off flap cooldown are asked to decide, and with event_driven
+    advance() jumps over stretches where no bird can act (see fast_forward).
+    """
+    gravity = 0.5
+    flap_strength = -10
+    flap_cooldown_frames = 20
+    pipe_velocity = 5
+
+    def __init__(self, size, screen_width=500, screen_height=700, base_height=112,
+                 bird_x=100, bird_y=350, bird_width=34, bird_height=24,
+                 pipe_width=88, pipe_height=544, pipe_gap=180, rng=None,
+                 courses=None, course_of=None, profiler=None, event_driven=True):
+        self.profiler = profiler or NULL_PROFILER
+        self.event_driven = event_driven
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.base_height = base_height
+        self.bird_x = bird_x
+        self.start_y = bird_y
+        self.bird_width = bird_width
+        self.bird_height = bird_height
+        self.pipe_width = pipe_width
+        self.pipe_height = pipe_height
+        self.pipe_gap = pipe_gap
+        if courses is None:
+            courses = [get_rng(rng)]
+        self.courses = [course if isinstance(course, PipeCourse)
+                        else PipeCourse.for_screen(course, screen_height, base_height, pipe_gap)
+                        for course in courses]
+        self.course_of = None if course_of is None else np.asarray(course_of, dtype=np.intp)
+
+        # Horizontal extent of every bird's rect never changes
+        self.bird_left = bird_x - bird_width // 2
+        self.bird_right = self.bird_left + bird_width
+        self.ground = screen_height - base_height
+
+        self.reset(size)
+
+    def reset(self, size=None):
+        """Put every bird back at the start and rebuild the pipes."""
+        if size is not None:
+            self.size = size
+        self.y = np.full(self.size, float(self.start_y))
+        self.velocity = np.zeros(self.size)
+        self.flap_cooldown = np.zeros(self.size, dtype=np.int32)
+        self.alive = np.ones(self.size, dtype=bool)
+        self.score = np.zeros(self.size, dtype=np.int64)
+        if self.course_of is None or len(self.course_of) != self.size:
+            if len(self.courses) > 1:
+                raise ValueError("course_of must give a course for every bird")
+            self.course_of = np.zeros(self.size, dtype=np.intp)
+        self.rect_top = self._rect_tops()
+        self.frame = 0
+        self.gaps_passed = 0
+        self.pipes_spawned = 0
+        self.pipes = PipeQueue(self.pipe_width, self.bird_left, self.bird_right, self.bird_x)
+        self.pipes.append(self.new_pipe())
+
+    def new_pipe(self):
+        """Spawn the next pipe of every course off the right edge."""
+        gap_centers = np.array([course.center(self.pipes_spawned) for course in self.courses])
+        self.pipes_spawned += 1
+        return PipeState(self.screen_width + 200, gap_centers, self.pipe_gap // 2, self.screen_height)
+
+    def per_bird(self, values, indices=None):
+        """Expand a per-course pipe field to the given birds (a scalar for one course)."""
+        if len(self.courses) == 1:
+            return values[0]
+        course_of = self.course_of if indices is None else self.course_of[indices]
+        return values[course_of]
+
+    def _rect_tops(self, y=None):
+        """
+        Top edge of each bird's rect (or of the rects at heights `y`).
+        pygame rounds a float centery half away from zero when it is assigned.
+        """
+        if y is None:
+            y = self.y
+        magnitude = np.abs(y)
+        whole = np.floor(magnitude)
+        centery = np.sign(y) * (whole + (magnitude - whole >= 0.5))
+        return centery.astype(np.int64) - self.bird_height // 2
+
+    def collide(self, pipe, top=None, indices=None):
+        """
+        Mask of birds whose rect overlaps either half of a pipe that is
+        already known to overlap them horizontally (Rect.colliderect).
+        `top` defaults to every bird's current rect top; an (n, k) array of
+        tops for the birds `indices` tests k frames at once.
+        """
+        if top is None:
+            top = self.rect_top
+        bottom = top + self.bird_height
+        top_pipe_height = self.per_bird(pipe.top_pipe_height, indices)
+        pipe_bottom = self.per_bird(pipe.bottom, indices)
+        if np.ndim(top) == 2 and np.ndim(top_pipe_height) == 1:
+            top_pipe_height, pipe_bottom = top_pipe_height[:, None], pipe_bottom[:, None]
+        hits_top = (top < top_pipe_height) & (bottom > top_pipe_height - self.pipe_height)
+        hits_bottom = (top < pipe_bottom + self.pipe_height) & (bottom > pipe_bottom)
+        return hits_top | hits_bottom
+
+    def build_inputs(self, pipe, indices):
+        """Network inputs for the given birds, in the order Game uses."""
+        inputs = np.empty((len(indices), 4))
+        inputs[:, 0] = self.y[indices] / self.screen_height
+        inputs[:, 1] = (pipe.x - self.bird_x) / self.screen_width
+        inputs[:, 2] = self.per_bird(pipe.top_pipe_height, indices) / self.screen_height
+        inputs[:, 3] = self.per_bird(pipe.bottom_pipe_height, indices) / self.screen_height
+        return inputs
+
+    def step(self, policy=None):
+        """
+        Advance one frame.
+        `policy(inputs, indices)` receives the (n, 4) inputs of the alive birds
+        and their indices, and returns a boolean flap decision per row.
+        """
+        profiler = self.profiler
+        profiler.start()
+        self.frame += 1
+        alive = self.alive
+        if profiler.enabled:
+            alive_before = np.count_nonzero(alive)
+
+        # Move pipes; only the pipe level with the birds can hit them
+        for pipe in self.pipes:
+            pipe.x -= self.pipe_velocity
+        self.pipes.advance()
+        profiler.lap('pipes')
+        pipe = self.pipes.collision_pipe()
+        if pipe is not None:
+            alive &= ~self.collide(pipe)
+        profiler.lap('collide')
+
+        # Score passed pipes
+        add_pipe = False
+        for pipe in self.pipes:
+            if not pipe.passed and pipe.x < self.screen_width // 2:
+                pipe.passed = True
+                add_pipe = True
+                self.score += alive
+
+        if add_pipe:
+            self.gaps_passed += 1
+            self.pipes.append(self.new_pipe())
+
+        self.pipes.drop_off_screen()
+        profiler.lap('score')
+
+        # Decide; a bird on flap cooldown couldn't flap whatever its network said
+        pipe = self.pipes.nearest_pipe()
+        if policy is not None and pipe is not None:
+            indices = np.flatnonzero(alive & (self.flap_cooldown == 0))
+            if len(indices):
+                decisions = np.asarray(policy(self.build_inputs(pipe, indices), indices), dtype=bool)
+                flappers = indices[decisions]
+                self.velocity[flappers] = self.flap_strength
+                self.flap_cooldown[flappers] = self.flap_cooldown_frames
+                profiler.count('forward_calls', len(indices))
+        profiler.lap('forward')
+
+        # Update: cooldown, gravity, position
+        np.subtract(self.flap_cooldown, 1, out=self.flap_cooldown, where=alive & (self.flap_cooldown > 0))
+        np.add(self.velocity, self.gravity, out=self.velocity, where=alive)
+        np.add(self.y, self.velocity, out=self.y, where=alive)
+        self.rect_top = np.where(alive, self._rect_tops(), self.rect_top)
+
+        # Check collision with ground or ceiling
+        if profiler.enabled:
+            stepped = np.count_nonzero(alive)
+        alive &= ~((self.rect_top + self.bird_height > self.ground) | (self.rect_top < 0))
+        if profiler.enabled:
+            profiler.count('bird_steps', stepped)
+            profiler.count('collisions', alive_before - np.count_nonzero(alive))
+        profiler.lap('update')
+
+    def frames_to_event(self, policy=None, limit=None):
+        """
+        How many frames from now can be simulated without any event: no
+        alive bird able to flap, and no pipe starting or stopping to overlap
+        the birds, being passed or leaving the screen. At most `limit`.
+        """
+        alive = self.alive
+        if not alive.any():
+            return 0
+        frames = limit if limit is not None else np.iinfo(np.int64).max
+        if policy is not None:
+            # Cooldowns only run down, so the birds on the shortest one decide first
+            frames = min(frames, int(self.flap_cooldown[alive].min()))
+        if frames <= 1:
+            return frames
+        v = self.pipe_velocity
+        # A pipe crosses threshold t on the first frame j where pipe.x - v * j < t
+        # (strict) or <= t: when it starts and stops overlapping the birds, is
+        # passed and drops off screen, as tested in step() and PipeQueue
+        for pipe in self.pipes:
+            thresholds = [(self.bird_right, True), (self.bird_left - self.pipe_width, False),
+                          (-self.pipe_width, True)]
+            if not pipe.passed:
+                thresholds.append((self.screen_width // 2, True))
+            for t, strict in thresholds:
+                if strict and pipe.x >= t:
+                    frames = min(frames, (pipe.x - t) // v)
+                elif not strict and pipe.x > t:
+                    frames = min(frames, -((t - pipe.x) // v) - 1)
+        return frames
+
+    def fast_forward(self, frames):
+        """
+        Advance `frames` frames in one go; only valid when frames_to_event()
+        allows it. Every bird then just falls: its heights are prefix sums of
+        the gravity parabola, computed in the same order as step() adds them,
+        so the result is bit-identical to stepping. A bird stops at its first
+        pipe or ground/ceiling hit, on the same frame step() would kill it.
+        Returns the frames run: fewer than `frames` if every bird dies first.
+        """
+        profiler = self.profiler
+        profiler.start()
+        indices = np.flatnonzero(self.alive)
+        n = len(indices)
+        # Column j is the state after j more frames (column 0 is now)
+        increments = np.full((n, frames + 1), self.gravity)
+        increments[:, 0] = self.velocity[indices]
+        velocity = np.cumsum(increments, axis=1)
+        increments = velocity.copy()
+        increments[:, 0] = self.y[indices]
+        y = np.cumsum(increments, axis=1)
+        top = self._rect_tops(y)
+        top[:, 0] = self.rect_top[indices]
+
+        # Frame j kills on a pipe before the move (state j - 1) and on the ground after it (state j)
+        last = np.full(n, frames)
+        died = np.zeros(n, dtype=bool)
+        ground = (top[:, 1:] + self.bird_height > self.ground) | (top[:, 1:] < 0)
+        ground_frame = np.where(ground.any(axis=1), ground.argmax(axis=1) + 1, frames + 1)
+        pipe = self.pipes.collision_pipe()
+        if pipe is not None:
+            hit = self.collide(pipe, top[:, :-1], indices)
+            pipe_frame = np.where(hit.any(axis=1), hit.argmax(axis=1) + 1, frames + 1)
+            by_pipe = pipe_frame <= ground_frame
+            last = np.where(by_pipe, pipe_frame - 1, last)
+            died |= by_pipe & (pipe_frame <= frames)
+        by_ground = ~died & (ground_frame <= frames)
+        last = np.where(by_ground, ground_frame, last)
+        died |= by_ground
+        if died.all():
+            # Stepping would stop on the frame the last bird dies
+            frames = int(np.where(by_ground, ground_frame, pipe_frame if pipe is not None else 0).max())
+
+        rows = np.arange(n)
+        self.velocity[indices] = velocity[rows, last]
+        self.y[indices] = y[rows, last]
+        self.rect_top[indices] = top[rows, last]
+        self.flap_cooldown[indices] = np.maximum(self.flap_cooldown[indices] - last, 0)
+        self.alive[indices[died]] = False
+
+        self.frame += frames
+        for pipe in self.pipes:
+            pipe.x -= self.pipe_velocity * frames
+        self.pipes.advance()
+        profiler.count('bird_steps', int(last.sum()))
+        profiler.count('collisions', int(np.count_nonzero(died)))
+        profiler.count('fast_forward_frames', frames)
+        profiler.lap('fast_forward')
+        return frames
+
+    def advance(self, policy=None, max_frames=None):
+        """
+        Simulate up to the next event: several frames at once when no bird
+        can act (see fast_forward), otherwise one step(). Returns frames run,
+        at most max_frames.
+        """
+        if self.event_driven:
+            frames = self.frames_to_event(policy, max_frames)
+            if frames > 1:
+                return self.fast_forward(frames)
+        self.step(policy)
+        return 1
+
+    def run(self, policy=None, max_frames=None):
+        """Step until every bird is dead (or max_frames is reached). Returns frames run."""
+        start = self.frame
+        while self.alive.any():
+            if max_frames is not None and self.frame - start >= max_frames:
+                break
+            self.advance(policy, None if max_frames is None else max_frames - (self.frame - start))
+        logger.debug("Simulated %d frames, %d gaps passed.", self.frame - start, self.gaps_passed)
+        return self.frame - start
+
+    def get_fitness_scores(self):
+        return self.score.tolist()
@@ -0,0 +1,242 @@
+# streaming.py
+"""
+Train populations that don't fit in memory.
+
+    python streaming.py --population-size 1000000 --chunk-size 20000 --generations 10 --seed 0
+
+The population lives in two memory-mapped genome files (this generation and
+the next). Every generation is streamed through in fixed-size chunks: each
+chunk is mapped, evaluated and unmapped again, and only a running top-K of
+parents and the fitness statistics stay in memory. Breeding then writes the
+next generation chunk by chunk into the other file. Memory use depends on
+the chunk size, not on the population size.
+"""
+import argparse
+import heapq
+import logging
+import math
+import os
+import pickle
+import numpy as np
+from assets import simulator_options
+from checkpoint import read_best_fitness, write_best
+from genetic_algorithm import crossover_rows, mutate_rows, select_parent_indices
+from neural_network import PARAMETER_COUNT, flatten_genome, unflatten_genome
+from parallel import ParallelEvaluator, evaluate_chunk, merge_results
+from scheduler import EvaluationScheduler
+from utils import configure_logging, get_rng
+
+logger = logging.getLogger(__name__)
+
+class GenomeStore:
+    """
+    One generation of flat float64 genome rows in a file on disk.
+    Rows are only ever touched through short-lived memory-mapped windows, so
+    no more than one chunk of the file is mapped at a time.
+    """
+    ROW_BYTES = PARAMETER_COUNT * np.dtype(np.float64).itemsize
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        # Sized up front (sparse where the filesystem allows it)
+        with open(path, 'ab') as f:
+            f.truncate(size * self.ROW_BYTES)
+
+    def __len__(self):
+        return self.size
+
+    def window(self, start, stop, mode='r'):
+        """Memory-mapped (stop - start, PARAMETER_COUNT) view of rows start:stop."""
+        return np.memmap(self.path, dtype=np.float64, mode=mode, offset=start * self.ROW_BYTES,
+                         shape=(stop - start, PARAMETER_COUNT))
+
+    def chunks(self, chunk_size, mode='r'):
+        """Yield (start, rows) windows covering the whole store in order."""
+        for start in range(0, self.size, chunk_size):
+            rows = self.window(start, min(start + chunk_size, self.size), mode)
+            yield start, rows
+            if mode != 'r':
+                rows.flush()
+            del rows
+
+class RunningStats:
+    """Count, mean, standard deviation, min and max of a stream of values."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        """Merge a batch of values (Chan et al.'s parallel variance update)."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+class TopK:
+    """
+    The k fittest genomes seen so far, as a min-heap of
+    (fitness, -index, row copy). The same parents, in the same order, as
+    select_parent_indices over the whole population: ties go to the
+    genome that came first.
+    """
+    def __init__(self, k):
+        self.k = k
+        self.heap = []
+
+    def push(self, start, fitness, rows):
+        """Offer one chunk: fitness[i] belongs to population row start + i."""
+        # Only a chunk's own top k can make it into the overall top k
+        for i in select_parent_indices(fitness, self.k):
+            entry = (float(fitness[i]), -(start + int(i)))
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, entry + (np.array(rows[i]),))
+            elif entry > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, entry + (np.array(rows[i]),))
+            else:
+                # Chunk rows come best first: the rest can't beat the heap either
+                break
+
+    def best(self):
+        """(indices, fitness, rows) of the kept genomes, best first."""
+        entries = sorted(self.heap, key=lambda entry: entry[:2], reverse=True)
+        return ([-entry[1] for entry in entries], [entry[0] for entry in entries],
+                np.stack([entry[2] for entry in entries]))
+
+def random_stream(store, chunk_size, rng=None, elite=None):
+    """Fill a store with standard-normal genomes; `elite` (a flat row) becomes row 0."""
+    rng = get_rng(rng)
+    for start, rows in store.chunks(chunk_size, mode='r+'):
+        rows[:] = rng.standard_normal(rows.shape)
+        if start == 0 and elite is not None:
+            rows[0] = elite
+
+def evaluate_stream(store, course_seeds, sim_options, num_parents, chunk_size, limits=None, evaluator=None):
+    """
+    Score every genome of a store chunk by chunk.
+    Returns (TopK of parents, RunningStats of the fitness, GenerationResult).
+    With an `evaluator` (ParallelEvaluator) each chunk is split across its
+    worker processes, otherwise chunks run in-process.
+    """
+    parents = TopK(num_parents)
+    stats = RunningStats()
+    results = []
+    for start, rows in store.chunks(chunk_size):
+        rows = np.array(rows)  # One chunk in memory, plain ndarray for pickling
+        if evaluator is not None:
+            fitness = np.asarray(evaluator.evaluate(rows, course_seeds))
+            result = evaluator.last_result
+        else:
+            fitness, result = evaluate_chunk(rows, course_seeds, sim_options, limits=limits)
+        parents.push(start, fitness, rows)
+        stats.update(fitness)
+        results.append(result)
+        logger.debug("Evaluated genomes %d-%d.", start, start + len(rows) - 1)
+    return parents, stats, merge_results(results)
+
+def breed_stream(parents, store, chunk_size, elite=None, mutation_rate=0.1, rng=None):
+    """
+    Write a whole generation of children of the `parents` rows into a store,
+    chunk by chunk; `elite` (a flat row) is kept unchanged as row 0.
+    """
+    rng = get_rng(rng)
+    for start, rows in store.chunks(chunk_size, mode='r+'):
+        keep_elite = start == 0 and elite is not None
+        children = crossover_rows(parents, len(rows) - keep_elite, rng)
+        mutate_rows(children, mutation_rate, rng)
+        if keep_elite:
+            rows[0] = elite
+        rows[int(keep_elite):] = children
+
+def main(population_size=100000, chunk_size=10000, generations=10, num_parents=20, workers=0, courses=1,
+         seed=None, fixed_courses=False, max_frames=None, max_score=None, directory='population',
+         output='best_genome.pkl'):
+    """
+    Evolve a population of `population_size` genomes kept in `directory`,
+    evaluating `chunk_size` genomes at a time. The best genome is written to
+    `output` whenever it improves, in best_genome.pkl format (with its
+    fitness recorded, see checkpoint.write_best).
+    """
+    os.makedirs(directory, exist_ok=True)
+    current = GenomeStore(os.path.join(directory, 'generation_a.bin'), population_size)
+    following = GenomeStore(os.path.join(directory, 'generation_b.bin'), population_size)
+    rng = np.random.default_rng(seed)
+
+    elite = None
+    if os.path.exists(output):
+        with open(output, 'rb') as f:
+            elite = flatten_genome(pickle.load(f))
+        logger.info("Seeding the population with the genome in %s.", output)
+    random_stream(current, chunk_size, rng, elite)
+    logger.info("Initialized population of %d genomes in %s.", population_size, directory)
+
+    sim_options = simulator_options()
+    # The same caps in-process and in every worker
+    scheduler = EvaluationScheduler(max_frames, max_score)
+    limits = scheduler.limits(partial=True)
+    evaluator = None
+    if workers > 0:
+        evaluator = ParallelEvaluator(workers, courses, sim_options=sim_options, scheduler=scheduler)
+    course_seeds = None
+    # The genome already in `output` is only replaced by a fitter one
+    best_so_far = read_best_fitness(output)
+    try:
+        for generation in range(1, generations + 1):
+            if course_seeds is None or not fixed_courses:
+                course_seeds = [int(course) for course in rng.integers(0, 2**63 - 1, size=courses)]
+            parents, stats, result = evaluate_stream(current, course_seeds, sim_options, num_parents,
+                                                     chunk_size, limits, evaluator)
+            indices, fitness, rows = parents.best()
+            logger.info("Generation %d: best=%s mean=%.2f std=%.2f",
+                        generation, fitness[0], stats.mean, stats.std)
+            if result.truncated:
+                logger.info("Generation %d truncated after %d frames: %s.", generation, result.frames, result.reason)
+            if best_so_far is None or fitness[0] > best_so_far:
+                best_so_far = fitness[0]
+                write_best(output, unflatten_genome(rows[0].copy()), fitness[0])
+                logger.debug("Saved genome %d of generation %d to %s.", indices[0], generation, output)
+
+            breed_stream(rows, following, chunk_size, elite=rows[0], rng=rng)
+            current, following = following, current
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+    logger.info("Training completed.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chunked training of very large populations.")
+    parser.add_argument('--population-size', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Genomes evaluated and bred at a time.")
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--num-parents', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=0, help="Split every chunk across this many processes.")
+    parser.add_argument('--courses', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--fixed-courses', action='store_true')
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--max-score', type=int, default=None)
+    parser.add_argument('--directory', default='population', help="Where the two generation files live.")
+    parser.add_argument('--output', default='best_genome.pkl')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = vars(parse_args())
+    configure_logging(options.pop('log_level'))
+    main(**options)
@@ -0,0 +1,41 @@
+# tests/conftest.py
+import os
+import sys
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from neural_network import PARAMETER_COUNT, GenomeMatrix, flatten_genome
+
+@pytest.fixture(autouse=True, scope='session')
+def repo_root():
+    """Sprite sizes (and so the collision geometry) are read from imgs/ relative to the repo."""
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    yield ROOT
+    os.chdir(cwd)
+
+def pilot_genome(offset=0.0, gain=20.0):
+    """
+    A hand-built genome that flaps whenever the bird is below the middle of
+    the next gap (shifted by `offset` screen heights), so seeded populations
+    fly through many pipes without relying on a trained best_genome.pkl.
+    """
+    w1, b1, w2, b2 = np.zeros((4, 5)), np.zeros(5), np.zeros((5, 1)), np.zeros(1)
+    # Gap middle / screen height = (top_pipe_height + screen_height - bottom_pipe_height) / 2
+    w1[:, 0] = [gain, 0, -gain / 2, gain / 2]
+    b1[0] = -gain * (0.5 + offset)
+    w2[0, 0] = 2
+    return flatten_genome(dict(w1=w1, b1=b1, w2=w2, b2=b2))
+
+@pytest.fixture
+def population():
+    """population(size, seed, noise=0.3): pilots with seeded noise, from crashing at once to flying on."""
+    def make(size, seed, noise=0.3):
+        rng = np.random.default_rng(seed)
+        offsets = rng.uniform(-0.02, 0.06, size)
+        rows = np.stack([pilot_genome(offset) for offset in offsets])
+        return GenomeMatrix(rows + rng.standard_normal((size, PARAMETER_COUNT)) * noise)
+    return make
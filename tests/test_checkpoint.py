@@ -0,0 +1,95 @@
+# tests/test_checkpoint.py
+import os
+import numpy as np
+import pytest
+from checkpoint import FITNESS_FILE, GENOMES_FILE, INDEX_FILE, GenomeArchive
+from replay import load_genomes
+
+def sizes(path):
+    return {name: os.path.getsize(os.path.join(path, name)) for name in (GENOMES_FILE, FITNESS_FILE, INDEX_FILE)}
+
+def append_generations(archive, population, count, size=8):
+    for generation in range(1, count + 1):
+        genomes = population(size, generation)
+        archive.append(generation, genomes.data, np.arange(size, dtype=np.float64) * generation, [generation])
+
+def test_read_only_open_leaves_a_generation_being_written_alone(tmp_path, population):
+    path = str(tmp_path / 'ck')
+    writer = GenomeArchive(path)
+    append_generations(writer, population, 2)
+    # Generation 2's rows and fitness are on disk but its index line isn't yet
+    index = os.path.join(path, INDEX_FILE)
+    with open(index, 'rb') as f:
+        lines = f.readlines()
+    with open(index, 'wb') as f:
+        f.write(lines[0])
+    before = sizes(path)
+
+    reader = GenomeArchive(path, read_only=True)
+    assert sizes(path) == before
+    assert reader.generations() == [1]
+    assert reader.load(1)[1].tolist() == list(range(8))
+    with pytest.raises(ValueError):
+        reader.append(3, np.zeros((1, 31)), [0.0])
+
+    # The writer finishes; the rows it wrote are all still there
+    with open(index, 'ab') as f:
+        f.write(lines[1])
+    genomes, fitness, _ = GenomeArchive(path, read_only=True).load(2)
+    assert np.array_equal(genomes.data, population(8, 2).data)
+    assert fitness.tolist() == [2.0 * i for i in range(8)]
+
+def test_read_only_open_needs_an_existing_archive(tmp_path):
+    path = str(tmp_path / 'missing')
+    with pytest.raises(FileNotFoundError):
+        GenomeArchive(path, read_only=True)
+    with pytest.raises(FileNotFoundError):
+        load_genomes(None, path)
+    assert not os.path.exists(path)
+
+def test_replay_loads_archived_elites(tmp_path, population):
+    path = str(tmp_path / 'ck')
+    append_generations(GenomeArchive(path), population, 3)
+    labels = [label for label, _ in load_genomes(None, path, ['latest', 1])]
+    assert labels == ["generation 3", "generation 1"]
+
+@pytest.mark.parametrize('written', [GENOMES_FILE, FITNESS_FILE, INDEX_FILE])
+def test_reopen_cuts_off_a_partly_written_generation(tmp_path, population, written):
+    path = str(tmp_path / 'ck')
+    append_generations(GenomeArchive(path), population, 2)
+    complete = sizes(path)
+    # A crash part-way through appending generation 3: files up to `written` got (some of) their bytes
+    for name, data in ((GENOMES_FILE, population(8, 3).data.tobytes()), (FITNESS_FILE, bytes(64)),
+                       (INDEX_FILE, b'{"generation": 3, "offs')):
+        with open(os.path.join(path, name), 'ab') as f:
+            f.write(data[:len(data) // 2] if name == written else data)
+        if name == written:
+            break
+
+    archive = GenomeArchive(path)
+    assert sizes(path) == complete
+    assert archive.generations() == [1, 2]
+    archive.append(3, population(8, 3).data, np.arange(8, dtype=np.float64) * 3, [3])
+    genomes, fitness, record = GenomeArchive(path).load(3)
+    assert np.array_equal(genomes.data, population(8, 3).data)
+    assert fitness.tolist() == [3.0 * i for i in range(8)]
+    assert record['offset'] == 16
+
+def test_resumed_run_is_byte_identical(tmp_path, repo_root):
+    import main
+    options = dict(headless=True, population_size=20, seed=3, max_frames=2000, fitness_cache=0)
+    archives = []
+    for name, runs in (('straight', [6]), ('resumed', [3, 3])):
+        run_dir = tmp_path / name
+        run_dir.mkdir()
+        (run_dir / 'imgs').symlink_to(os.path.join(repo_root, 'imgs'))
+        os.chdir(run_dir)
+        try:
+            for i, generations in enumerate(runs):
+                main.main(generations=generations, checkpoint_dir='ck', resume='latest' if i else None, **options)
+        finally:
+            os.chdir(repo_root)
+        archives.append(run_dir / 'ck')
+    for name in (GENOMES_FILE, FITNESS_FILE, INDEX_FILE):
+        assert (archives[0] / name).read_bytes() == (archives[1] / name).read_bytes(), name
+    assert GenomeArchive(str(archives[1]), read_only=True).generations() == [1, 2, 3, 4, 5, 6]
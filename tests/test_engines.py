@@ -0,0 +1,35 @@
+# tests/test_engines.py
+"""The vectorized PopulationSimulator must play exactly the object engine's game."""
+import numpy as np
+import pytest
+from assets import simulator_options
+from game import Game
+from genetic_algorithm import birds_from_genomes
+from neural_network import PopulationBrain
+from simulation import PopulationSimulator
+
+@pytest.mark.parametrize('seed', range(4))
+def test_vectorized_engine_matches_objects(population, seed):
+    genomes = population(30, seed)
+    max_frames = 1500
+
+    birds = birds_from_genomes(genomes)
+    game = Game(birds, None)
+    game.reset(birds, seed=seed)
+    frames = 0
+    while frames < max_frames and any(bird.is_alive for bird in birds):
+        game.step()
+        frames += 1
+
+    sim = PopulationSimulator(len(genomes), rng=np.random.default_rng(seed), event_driven=False,
+                              **simulator_options())
+    brain = PopulationBrain.from_flat(genomes.data)
+    assert sim.run(brain, max_frames) == frames
+    assert sim.gaps_passed == game.gaps_passed
+    assert sim.score.tolist() == [bird.score for bird in birds]
+    assert sim.alive.tolist() == [bird.is_alive for bird in birds]
+    assert sim.y.tolist() == [bird.y for bird in birds]
+    assert sim.velocity.tolist() == [bird.velocity for bird in birds]
+    assert sim.flap_cooldown.tolist() == [bird.flap_cooldown for bird in birds]
+    assert sim.rect_top.tolist() == [bird.rect.top for bird in birds]
+    assert [pipe.x for pipe in sim.pipes] == [pipe.x for pipe in game.pipes]
@@ -0,0 +1,57 @@
+# tests/test_eval_server.py
+import asyncio
+import os
+import socket
+import threading
+import numpy as np
+import pytest
+import eval_server
+from eval_server import EvaluationClient, EvaluationServer, remove_stale_socket
+
+@pytest.fixture
+def server_path(tmp_path, monkeypatch):
+    """A server on a Unix socket whose course seed 7 always fails."""
+    evaluate_chunk = eval_server.evaluate_chunk
+    def flaky(rows, course_seeds, *args, **kwargs):
+        if list(course_seeds) == [7]:
+            raise RuntimeError("boom")
+        return evaluate_chunk(rows, course_seeds, *args, **kwargs)
+    monkeypatch.setattr(eval_server, 'evaluate_chunk', flaky)
+    path = str(tmp_path / 'eval.sock')
+    loop = asyncio.new_event_loop()
+    server = EvaluationServer(max_batch_size=64, max_wait=0.001, max_frames=300)
+    loop.run_until_complete(server.start(path=path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield path
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def test_client_reads_a_failed_request_to_the_end(server_path, population):
+    genomes = population(4, 0)
+    with EvaluationClient(server_path) as client:
+        expected = client.evaluate(genomes, course_seeds=[0])
+        with pytest.raises(RuntimeError, match="boom"):
+            client.evaluate(genomes, course_seeds=[7])
+        with pytest.raises(RuntimeError, match="Bad request"):
+            client.evaluate(genomes, course_seeds=[-1])
+        # No stale lines from the failed requests
+        assert client.evaluate(genomes, course_seeds=[0]) == expected
+        assert client.metrics()['requests'] == 3
+
+def test_remove_stale_socket_only_removes_sockets(tmp_path):
+    remove_stale_socket(str(tmp_path / 'missing'))
+    regular = tmp_path / 'notes.txt'
+    regular.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        remove_stale_socket(str(regular))
+    assert regular.read_text() == "keep me"
+
+    stale = str(tmp_path / 'stale.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(stale)
+    listener.close()
+    remove_stale_socket(stale)
+    assert not os.path.exists(stale)
@@ -0,0 +1,54 @@
+# tests/test_hitbox.py
+"""Hitbox must keep the integer geometry of the pygame.Rect it replaced."""
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from bird import Hitbox
+from pipe import Pipe
+from simulation import PopulationSimulator
+
+pygame = pytest.importorskip('pygame')
+
+def edges(rect):
+    return (rect.left, rect.top, rect.right, rect.bottom, rect.width, rect.height, rect.center, rect.centery)
+
+def heights():
+    """Bird heights as Bird.update produces them, plus the rounding edge cases."""
+    rng = np.random.default_rng(0)
+    halves = [k + 0.5 for k in range(-5, 5)]
+    return halves + [-0.49999999999999994, 0.49999999999999994, 0.0, -0.0] + rng.uniform(-50, 750, 500).tolist()
+
+def test_centery_rounds_like_pygame():
+    hitbox, rect = Hitbox(0, 0, 34, 24), pygame.Rect(0, 0, 34, 24)
+    for y in heights():
+        hitbox.centery = y
+        rect.centery = y
+        assert edges(hitbox) == edges(rect), y
+
+def test_center_rounds_like_pygame():
+    hitbox, rect = Hitbox(0, 0, 34, 24), pygame.Rect(0, 0, 34, 24)
+    for x, y in zip(heights(), reversed(heights())):
+        hitbox.center = (x, y)
+        rect.center = (x, y)
+        assert edges(hitbox) == edges(rect), (x, y)
+
+def test_simulator_rect_tops_round_like_pygame():
+    sim = PopulationSimulator(1, rng=np.random.default_rng(0), bird_height=24)
+    rect = pygame.Rect(0, 0, 34, 24)
+    tops = []
+    for y in heights():
+        rect.centery = y
+        tops.append(rect.top)
+    assert sim._rect_tops(np.array(heights())).tolist() == tops
+
+def test_pipe_collide_matches_colliderect():
+    pipe = Pipe(0, 700, 112, gap_center=300)
+    bird = SimpleNamespace(rect=Hitbox(0, 0, 34, 24))
+    for x in range(-100, 140, 3):
+        pipe.x = x
+        top = pygame.Rect(pipe.x, pipe.top, pipe.WIDTH, pipe.image_height)
+        bottom = pygame.Rect(pipe.x, pipe.bottom, pipe.WIDTH, pipe.image_height)
+        for y in heights()[::5]:
+            bird.rect.center = (100, y)
+            rect = pygame.Rect(tuple(bird.rect))
+            assert pipe.collide(bird) == bool(top.colliderect(rect) or bottom.colliderect(rect)), (x, y)
@@ -0,0 +1,60 @@
+# tests/test_policy.py
+"""Compiled policies must decide exactly like PopulationBrain."""
+import numpy as np
+import pytest
+from assets import simulator_options
+from neural_network import NeuralNetwork, PopulationBrain
+from policy import SCALAR_BATCH_LIMIT, BufferedPolicy, ScalarPolicy, compile_policy
+from simulation import PopulationSimulator
+
+def random_inputs(rng, n):
+    return rng.uniform(-1, 2, (n, 4))
+
+def test_buffered_policy_is_bit_identical(population):
+    genomes = population(50, 0, noise=1.0)
+    brain = PopulationBrain.from_flat(genomes.data)
+    policy = BufferedPolicy.from_flat(genomes.data)
+    rng = np.random.default_rng(0)
+    for n in (50, 17, 1, 50):
+        inputs = random_inputs(rng, n)
+        indices = np.sort(rng.choice(50, n, replace=False))
+        expected = brain.forward(inputs, indices)
+        # The buffers are reused from call to call
+        assert policy.forward(inputs, indices).tobytes() == expected.tobytes()
+        assert policy(inputs, indices).tolist() == brain(inputs, indices).tolist()
+
+def test_scalar_policy_matches_up_to_summation_order(population):
+    genomes = population(3, 1, noise=1.0)
+    brain = PopulationBrain.from_flat(genomes.data)
+    policy = ScalarPolicy(genomes)
+    rng = np.random.default_rng(1)
+    inputs = random_inputs(rng, 200)
+    indices = rng.integers(0, 3, 200)
+    np.testing.assert_allclose(policy.forward(inputs, indices), brain.forward(inputs, indices), rtol=0, atol=1e-12)
+    network = NeuralNetwork(**genomes.genome(0))
+    assert policy.forward_one(inputs[0]) == pytest.approx(float(network.forward(inputs[0])), abs=1e-12)
+
+def test_compile_policy_picks_by_batch_size(population):
+    assert isinstance(compile_policy(population(SCALAR_BATCH_LIMIT, 2)), ScalarPolicy)
+    assert isinstance(compile_policy(population(SCALAR_BATCH_LIMIT + 1, 2)), BufferedPolicy)
+    assert isinstance(compile_policy(population(1, 2).genome(0)), ScalarPolicy)
+
+@pytest.mark.parametrize('size', [3, 40])
+def test_compiled_policy_plays_the_same_game(population, size):
+    genomes = population(size, 3)
+    scores = []
+    for policy in (PopulationBrain.from_flat(genomes.data), compile_policy(genomes)):
+        sim = PopulationSimulator(size, rng=np.random.default_rng(3), **simulator_options())
+        frames = sim.run(policy, max_frames=3000)
+        scores.append((frames, sim.score.tolist(), sim.y.tobytes()))
+    assert scores[0] == scores[1]
+
+@pytest.mark.parametrize('indices', [[2, 1, 0], [0, 0, 2], [1, 2, 0, 0, 1], [0, 1, 2]])
+def test_policies_gather_permuted_and_repeated_indices(population, indices):
+    genomes = population(3, 4, noise=1.0)
+    inputs = random_inputs(np.random.default_rng(4), len(indices))
+    expected = [ScalarPolicy(genomes.data[i]).forward_one(row) for i, row in zip(indices, inputs)]
+    for policy in (PopulationBrain.from_flat(genomes.data), BufferedPolicy.from_flat(genomes.data),
+                   ScalarPolicy(genomes)):
+        outputs = policy.forward(inputs, np.array(indices))
+        np.testing.assert_allclose(outputs, expected, rtol=0, atol=1e-12)
@@ -0,0 +1,90 @@
+# tests/test_simulation.py
+"""Event-driven PopulationSimulator must be frame-exact with plain stepping."""
+import numpy as np
+import pytest
+from assets import simulator_options
+from neural_network import GenomeMatrix, PopulationBrain
+from profiling import Profiler
+from scheduler import EvaluationScheduler
+from simulation import PopulationSimulator
+
+def make_simulator(genomes, course_seeds, event_driven):
+    profiler = Profiler()
+    profiler.begin_generation(1)
+    courses = len(course_seeds)
+    sim = PopulationSimulator(len(genomes) * courses, courses=list(course_seeds),
+                              course_of=np.repeat(np.arange(courses), len(genomes)), profiler=profiler,
+                              event_driven=event_driven, **simulator_options())
+    brain = PopulationBrain.from_flat(np.tile(genomes.data, (courses, 1)))
+    return sim, brain, profiler
+
+def state(sim):
+    """Everything stepping and fast-forwarding have to agree on, bit for bit."""
+    return dict(frame=sim.frame, gaps_passed=sim.gaps_passed, y=sim.y.tobytes(), velocity=sim.velocity.tobytes(),
+                flap_cooldown=sim.flap_cooldown.tolist(), alive=sim.alive.tolist(), score=sim.score.tolist(),
+                rect_top=sim.rect_top.tolist(), pipes=[(pipe.x, pipe.passed) for pipe in sim.pipes])
+
+def counters(profiler):
+    return {name: profiler.counters[name] for name in ('bird_steps', 'collisions', 'forward_calls')}
+
+@pytest.mark.parametrize('courses', [1, 3])
+@pytest.mark.parametrize('seed', range(6))
+def test_event_driven_run_matches_stepping(population, seed, courses):
+    genomes = population(40, seed)
+    course_seeds = [seed * 10 + course for course in range(courses)]
+    results = []
+    for event_driven in (False, True):
+        sim, brain, profiler = make_simulator(genomes, course_seeds, event_driven)
+        frames = sim.run(brain, max_frames=3000)
+        results.append((frames, state(sim), counters(profiler)))
+        if event_driven:
+            # Otherwise the comparison proves nothing
+            assert profiler.counters['fast_forward_frames'] > 0
+    assert results[0] == results[1]
+
+def test_event_driven_without_policy_matches_stepping():
+    results = []
+    for event_driven in (False, True):
+        sim = PopulationSimulator(5, rng=np.random.default_rng(0), event_driven=event_driven,
+                                  **simulator_options())
+        sim.y += np.arange(5) * 40.0
+        frames = sim.run()
+        results.append((frames, state(sim)))
+    assert results[0] == results[1]
+
+@pytest.mark.parametrize('max_frames', [1, 19, 20, 21, 777])
+def test_run_simulator_stops_on_the_frame_cap(population, max_frames):
+    genomes = population(30, 7, noise=0.1)
+    results = []
+    for event_driven in (False, True):
+        sim, brain, _ = make_simulator(genomes, [7], event_driven)
+        result = EvaluationScheduler(max_frames=max_frames).run_simulator(sim, brain)
+        results.append((result.frames, result.truncated, result.reason, state(sim)))
+    assert results[0] == results[1]
+    assert results[0][:3] == (max_frames, True, f"frame cap {max_frames}")
+
+def test_run_simulator_stops_on_the_score_cap(population):
+    genomes = population(30, 8, noise=0.1)
+    results = []
+    for event_driven in (False, True):
+        sim, brain, _ = make_simulator(genomes, [8], event_driven)
+        result = EvaluationScheduler(max_score=5).run_simulator(sim, brain)
+        results.append((result.frames, result.reason, state(sim)))
+    assert results[0] == results[1]
+    assert results[0][1] == "score cap 5"
+
+@pytest.mark.parametrize('check_every', [7, 60])
+def test_run_simulator_stops_on_identical_survivors(population, check_every):
+    # Clones of one good pilot, plus strangers that crash early
+    clones = np.tile(population(1, 9, noise=0.0).data, (10, 1))
+    genomes = GenomeMatrix(np.concatenate([clones, population(10, 9, noise=3.0).data]))
+    results = []
+    for event_driven in (False, True):
+        sim, brain, _ = make_simulator(genomes, [9], event_driven)
+        scheduler = EvaluationScheduler(max_frames=5000, stop_identical=True, check_every=check_every)
+        result = scheduler.run_simulator(sim, brain, genomes.data)
+        results.append((result.frames, result.reason, state(sim)))
+    assert results[0] == results[1]
+    frames, reason, _ = results[0]
+    assert reason == "identical survivors"
+    assert frames % check_every == 0